@@ -1,12 +1,27 @@
+import time
+
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from bcb import PTAX as BCB_PTAX
-import os
+
+from single_flight import limpar_todos
+from wdo_calc import (
+    fmt, em_distorcao, calc_abertura_wdo, calc_over, calc_preco_justo, calc_bandas, frame_bandas_ptax,
+)
+from market_snapshot import ROTULOS_FONTES, obter_snapshot, snapshot_atual, tabela_bandas
+from snapshot_api import iniciar_api, porta_configurada
+from dde_watch import ObservadorDDE, arquivo_configurado
+from intraday import atualizar_todos, paridades_intraday, ultimo_intraday
+from distortion_monitor import MonitorDistorcao, PARES
+from volatility import FONTES_VOL, vol_de_serie, vol_intraday
+from wdo_sources import TICKERS
+from history_store import fechamentos
+from ptax_store import ptax_periodo
+from source_metrics import tabela_metricas, registrar_rerun
+from circuit_breaker import tabela_disjuntores
+from profiling import iniciar_perfil, encerrar_perfil
+
+inicio_rerun = time.perf_counter()
+perfil = iniciar_perfil()      # opt-in: ?perfil=1 ou WDO_PERFIL=1
 
 # ─────────────────────────────────────────────
 # Configuração da página
@@ -17,6 +32,27 @@ st.set_page_config(
     layout="wide",
 )
 
+# ─────────────────────────────────────────────
+# API local (opcional, via WDO_API_PORT) — uma instância por processo
+# ─────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def api_local(porta: int):
+    return iniciar_api(porta)
+
+if porta_configurada():
+    api_local(porta_configurada())
+
+# ─────────────────────────────────────────────
+# Planilha DDE local (opcional, via WDO_DDE_ARQUIVO)
+# ─────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def observador_dde(caminho: str):
+    return ObservadorDDE(caminho).iniciar()
+
+dde = observador_dde(arquivo_configurado()) if arquivo_configurado() else None
+if dde is not None and dde.assinatura is None:
+    dde.verificar()      # primeira carga antes do snapshot
+
 # ─────────────────────────────────────────────
 # CSS customizado — tema dark estilo terminal
 # ─────────────────────────────────────────────
@@ -115,233 +151,23 @@ h1, h2, h3, p, label, div { color: #e6edf3; }
 </style>
 """, unsafe_allow_html=True)
 
-# ─────────────────────────────────────────────
-# Constantes
-# ─────────────────────────────────────────────
-TICKERS = {
-    "cme":     "6L=F",
-    "brl_usd": "BRLUSD=X",
-    "xauusd":  "GC=F",
-    "dxy":     "DX-Y.NYB",
-}
-URL_OURO_BRL   = "https://www.melhorcambio.com/ouro-hoje"
-URL_PLANILHA   = "https://raw.githubusercontent.com/Mvrsant/calculoswdo/main/ddeprofit.xlsx"
-PLANILHA_LOCAL = "ddeprofit.xlsx"
-HEADERS        = {"User-Agent": "Mozilla/5.0"}
-TZ             = ZoneInfo("America/Sao_Paulo")
-
-# ─────────────────────────────────────────────
-# Utilitários
-# ─────────────────────────────────────────────
-def agora_br():
-    return datetime.now(tz=TZ).strftime("%d/%m/%Y %H:%M:%S")
-
-def calcular_vencimento_wdo(data_base: datetime) -> datetime:
-    mes = data_base.month + 1 if data_base.month < 12 else 1
-    ano = data_base.year  if data_base.month < 12 else data_base.year + 1
-    d   = datetime(ano, mes, 1)
-    while d.weekday() >= 5:
-        d += timedelta(days=1)
-    return d
-
-# ─────────────────────────────────────────────
-# Funções de busca de dados
-# ─────────────────────────────────────────────
-@st.cache_data(ttl=300, show_spinner=False)
-def buscar_yfinance(ticker: str, period: str = "5d") -> dict | None:
-    try:
-        hist = yf.Ticker(ticker).history(period=period)
-        if hist.empty:
-            return None
-        return {
-            "open":  round(hist["Open"].iloc[-1],  4),
-            "high":  round(hist["High"].iloc[-1],  4),
-            "low":   round(hist["Low"].iloc[-1],   4),
-            "close": round(hist["Close"].iloc[-1], 4),
-            "prev":  round(hist["Close"].iloc[-2], 4) if len(hist) >= 2 else None,
-        }
-    except Exception as e:
-        st.warning(f"yfinance [{ticker}]: {e}")
-        return None
-
-@st.cache_data(ttl=300, show_spinner=False)
-def buscar_variacao_dxy() -> float | None:
-    try:
-        hist = yf.Ticker(TICKERS["dxy"]).history(period="5d")
-        if len(hist) < 2:
-            return None
-        ant  = hist["Close"].iloc[-2]
-        atual = hist["Close"].iloc[-1]
-        return round(((atual - ant) / ant) * 100, 4)
-    except Exception as e:
-        st.warning(f"DXY variação: {e}")
-        return None
-
-@st.cache_data(ttl=600, show_spinner=False)
-def buscar_ouro_brl() -> float | None:
-    try:
-        r    = requests.get(URL_OURO_BRL, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(r.content, "html.parser")
-        val  = soup.find("input", {"id": "comercial"}).get("value")
-        return float(val.replace(",", "."))
-    except Exception as e:
-        st.warning(f"Ouro BRL: {e}")
-        return None
-
-@st.cache_data(ttl=600, show_spinner=False)
-def buscar_planilha_github() -> dict | None:
-    try:
-        r = requests.get(URL_PLANILHA, timeout=15)
-        if r.status_code != 200:
-            st.warning(f"Planilha GitHub: status {r.status_code}")
-            return None
-        with open(PLANILHA_LOCAL, "wb") as f:
-            f.write(r.content)
-
-        df   = pd.read_excel(PLANILHA_LOCAL)
-        cols = ["Asset", "Fechamento Anterior", "Último"]
-        if not all(c in df.columns for c in cols):
-            st.warning("Colunas ausentes na planilha.")
-            return None
-        df["Asset"] = df["Asset"].str.strip()
-
-        def val(ativo, col):
-            try:
-                return float(df.loc[df["Asset"] == ativo, col].values[0])
-            except Exception:
-                return None
-
-        hoje     = datetime.today()
-        venc     = calcular_vencimento_wdo(hoje)
-        du       = len(pd.bdate_range(start=hoje, end=venc))
-
-        return {
-            "wdo_fut":                val("WDOFUT", "Fechamento Anterior"),
-            "dolar_spot":             val("USD/BRL", "Fechamento Anterior"),
-            "di1_fut":                val("DI1FUT", "Último"),
-            "frp0":                   val("FRP0",   "Último"),
-            "expiration_date":        venc.strftime("%d/%m/%Y"),
-            "business_days_remaining": du,
-        }
-    except Exception as e:
-        st.warning(f"Planilha GitHub: {e}")
-        return None
-
-@st.cache_data(ttl=600, show_spinner=False)
-def buscar_sup_volb3() -> float | None:
-    try:
-        if not os.path.exists(PLANILHA_LOCAL):
-            r = requests.get(URL_PLANILHA, timeout=15)
-            with open(PLANILHA_LOCAL, "wb") as f:
-                f.write(r.content)
-        df = pd.read_excel(PLANILHA_LOCAL, sheet_name="base_b3", header=None)
-        return float(df.iloc[18, 6])
-    except Exception as e:
-        st.warning(f"SUP_VOLB3: {e}")
-        return None
-
-@st.cache_data(ttl=300, show_spinner=False)
-def buscar_ptax() -> list:
-    try:
-        ptax     = BCB_PTAX()
-        endpoint = ptax.get_endpoint("CotacaoMoedaPeriodo")
-        data_c   = datetime.today().date()
-
-        for _ in range(7):
-            s   = data_c.strftime("%m.%d.%Y")
-            df  = (endpoint.query()
-                   .parameters(moeda="USD", dataInicial=s, dataFinalCotacao=s)
-                   .collect())
-            if not df.empty:
-                break
-            data_c -= timedelta(days=1)
-        else:
-            return [None] * 4
-
-        df["dataHoraCotacao"] = pd.to_datetime(df["dataHoraCotacao"])
-        df = df[df["dataHoraCotacao"].dt.date == data_c].sort_values("dataHoraCotacao").reset_index(drop=True)
-
-        cotacoes = [
-            {"valor": row["cotacaoVenda"],
-             "data":  row["dataHoraCotacao"].strftime("%d/%m/%Y"),
-             "hora":  row["dataHoraCotacao"].strftime("%H:%M")}
-            for _, row in df.iterrows()
-        ]
-        while len(cotacoes) < 4:
-            cotacoes.append(None)
-        return cotacoes[:4]
-    except Exception as e:
-        st.warning(f"PTAX: {e}")
-        return [None] * 4
-
-# ─────────────────────────────────────────────
-# Funções de cálculo
-# ─────────────────────────────────────────────
-def calc_abertura_wdo(wdo_fechamento, dxy_var):
-    if None in (wdo_fechamento, dxy_var):
-        return None
-    return round(wdo_fechamento * (1 + dxy_var / 100), 4)
-
-def calc_over(di1_fut, dias_uteis):
-    if None in (di1_fut, dias_uteis):
-        return None
-    return round(((1 + di1_fut) ** (1 / 252) - 1) * dias_uteis, 6)
-
-def calc_preco_justo(dolar_spot, over):
-    if None in (dolar_spot, over):
-        return None
-    return round(dolar_spot * (1 + over / 100), 4)
-
-def calc_paridade_ouro(xauusd, ouro_brl_g):
-    if None in (xauusd, ouro_brl_g):
-        return None
-    return round((ouro_brl_g / (xauusd / 31.1035)) * 1000, 4)
-
-def calc_bandas(wdo_abertura, over, sup_volb3):
-    if None in (wdo_abertura, over, sup_volb3):
-        return None
-    d = (wdo_abertura * over / 100) + sup_volb3
-    return {
-        "deslocamento":  round(d, 5),
-        "1ª Máxima":     round(wdo_abertura + d, 2),
-        "1ª Mínima":     round(wdo_abertura - d, 2),
-        "2ª Máxima":     round((wdo_abertura + d) * 1.005, 2),
-        "2ª Mínima":     round((wdo_abertura - d) * 0.995, 2),
-    }
-
-def calc_bandas_ptax(wdo_abertura, over, sup_volb3, ptaxes):
-    b = calc_bandas(wdo_abertura, over, sup_volb3)
-    if b is None:
-        return None
-    d   = b["deslocamento"]
-    res = {"deslocamento_val": d, "deslocamento_pts": round(d * 1000, 4), "ptaxes": []}
-    for p in ptaxes:
-        if p is None:
-            res["ptaxes"].append(None)
-            continue
-        base = p["valor"] * 1000
-        res["ptaxes"].append({
-            "valor":      p["valor"],
-            "data":       p["data"],
-            "hora":       p["hora"],
-            "1ª Máxima":  round(base + d, 2),
-            "1ª Mínima":  round(base - d, 2),
-            "2ª Máxima":  round((base + d) * 1.005, 2),
-            "2ª Mínima":  round((base - d) * 0.995, 2),
-        })
-    return res
-
 # ─────────────────────────────────────────────
 # Helpers de exibição
 # ─────────────────────────────────────────────
-def fmt(v, dec=2):
-    return f"{v:.{dec}f}" if v is not None else "—"
-
 def delta_color(v):
     if v is None:
         return "off"
     return "normal" if v >= 0 else "inverse"
 
+def idade_legivel(segundos: float) -> str:
+    if segundos < 90:
+        return f"{segundos:.0f} s"
+    if segundos < 90 * 60:
+        return f"{segundos / 60:.0f} min"
+    if segundos < 36 * 3600:
+        return f"{segundos / 3600:.1f} h"
+    return f"{segundos / 86400:.1f} dias"
+
 def status_badge(ok: bool):
     if ok:
         return '<span class="tag-ok">✓ OK</span>'
@@ -370,55 +196,59 @@ with col_h3:
     atualizar = st.button("🔄 Atualizar", use_container_width=True)
     if atualizar:
         st.cache_data.clear()
+        limpar_todos()
         st.rerun()
 
 st.markdown("<hr style='border-color:#30363d;margin:0 0 16px 0'>", unsafe_allow_html=True)
 
 # ─────────────────────────────────────────────
-# CARGA DE DADOS (com spinner único)
+# CARGA DE DADOS (snapshot compartilhado, pintado aos poucos)
 # ─────────────────────────────────────────────
+# Quando este rerun é o que monta o snapshot, os valores da planilha (over,
+# preço justo, vencimento) aparecem assim que ela chega e as demais fontes
+# preenchem o painel conforme respondem. Com snapshot pronto nada é pintado aqui.
+painel_parcial = st.empty()
+
+def pintar_parcial(p, pendentes):
+    with painel_parcial.container():
+        st.caption("⏳ Aguardando: " + " · ".join(dict.fromkeys(ROTULOS_FONTES[n] for n in pendentes)))
+        c = st.columns(6)
+        c[0].metric("WDO Fech. Ant.", fmt(p.wdo_fut, 2))
+        c[1].metric("Over (DI1)",     fmt(p.over, 6))
+        c[2].metric("Preço Justo",    fmt(p.preco_justo, 4))
+        c[3].metric("Abertura Est.",  fmt(p.wdo_abertura, 2))
+        c[4].metric("Paridade Ouro",  fmt(p.paridade_ouro, 4))
+        c[5].metric("PTAX recente",   fmt(p.ptax_recente_brl, 2))
+        if p.df_bandas is not None:
+            st.dataframe(colorir_bandas(p.df_bandas), hide_index=True, use_container_width=True)
+
 with st.spinner("Buscando dados — yfinance · BCB · B3 · melhorcambio..."):
-    planilha   = buscar_planilha_github()
-    sup_volb3  = buscar_sup_volb3()
-    xauusd_d   = buscar_yfinance(TICKERS["xauusd"])
-    xauusd     = xauusd_d["close"] if xauusd_d else None
-    ouro_brl   = buscar_ouro_brl()
-    dxy_var    = buscar_variacao_dxy()
-    cme_d      = buscar_yfinance(TICKERS["cme"])
-    brlusd_d   = buscar_yfinance(TICKERS["brl_usd"])
-    ptax_cots  = buscar_ptax()
-
-# ─── Cálculos derivados ─────────────────────
-wdo_fut   = planilha.get("wdo_fut")   if planilha else None
-dolar_spot = planilha.get("dolar_spot") if planilha else None
-di1_fut   = planilha.get("di1_fut")   if planilha else None
-du        = planilha.get("business_days_remaining") if planilha else None
-venc_str  = planilha.get("expiration_date") if planilha else "—"
-
-wdo_abertura = calc_abertura_wdo(wdo_fut, dxy_var)
-over         = calc_over(di1_fut, du)
-preco_justo  = calc_preco_justo(dolar_spot, over)
-paridade_ouro = calc_paridade_ouro(xauusd, ouro_brl)
-bandas       = calc_bandas(wdo_abertura, over, sup_volb3)
-bandas_ptax  = calc_bandas_ptax(wdo_abertura, over, sup_volb3, ptax_cots)
+    snap = obter_snapshot(ao_chegar=pintar_parcial)
+painel_parcial.empty()
+
+# Partida a frio: o snapshot salvo em disco aparece na hora; quando o novo fica
+# pronto (montado em segundo plano) a página roda de novo sozinha.
+if snap.do_disco:
+    idade = time.time() - snap.gerado_em.timestamp()
+    st.info(f"📦 Último snapshot salvo ({snap.horario}, há {idade_legivel(idade)}). "
+            "Buscando dados novos em segundo plano...")
+
+    @st.fragment(run_every=2)
+    def aguardar_snapshot_novo():
+        atual = snapshot_atual()
+        if atual is not None and not atual.do_disco:
+            st.rerun()
+
+    aguardar_snapshot_novo()
 
 # ─────────────────────────────────────────────
 # Funções de alerta de distorção
 # ─────────────────────────────────────────────
-def calc_distorcao(preco_ref, paridade, label):
-    """Retorna dict com desvio em pts e % entre preço de referência e uma paridade."""
-    if preco_ref is None or paridade is None:
-        return None
-    desvio_pts = round(preco_ref - paridade, 2)
-    desvio_pct = round((preco_ref - paridade) / paridade * 100, 4)
-    return {"label": label, "ref": preco_ref, "paridade": paridade,
-            "desvio_pts": desvio_pts, "desvio_pct": desvio_pct}
-
 def badge_distorcao(d, lim_pts, lim_pct):
     """Retorna HTML do badge de status baseado nos limiares configurados."""
     if d is None:
         return '<span style="background:#21262d;color:#6e7681;border-radius:4px;font-size:11px;padding:2px 8px;font-family:JetBrains Mono">sem dados</span>'
-    alerta = abs(d["desvio_pts"]) > lim_pts or abs(d["desvio_pct"]) > lim_pct
+    alerta = em_distorcao(d, lim_pts, lim_pct)
     if alerta:
         cor_bg, cor_txt, icone = "#3d1a1a", "#f85149", "⚠ DISTORÇÃO"
     else:
@@ -430,7 +260,7 @@ def card_alerta(d, lim_pts, lim_pct):
     """Renderiza um card completo de distorção com st.metric + badge."""
     if d is None:
         return
-    alerta = abs(d["desvio_pts"]) > lim_pts or abs(d["desvio_pct"]) > lim_pct
+    alerta = em_distorcao(d, lim_pts, lim_pct)
     cor = "#f85149" if alerta else "#3fb950"
     sinal = "+" if d["desvio_pts"] >= 0 else ""
     st.markdown(
@@ -458,35 +288,38 @@ def card_alerta(d, lim_pts, lim_pct):
         unsafe_allow_html=True
     )
 
-horario = agora_br()
-
-# ─── PTAX mais recente e distorções ────────
-ptax_recente = next((p for p in reversed(ptax_cots) if p is not None), None)
-ptax_recente_brl = round(ptax_recente["valor"] * 1000, 2) if ptax_recente else None
-
-dist_ouro = calc_distorcao(wdo_fut, paridade_ouro, "WDO vs Paridade Ouro")
-dist_ptax  = calc_distorcao(wdo_fut, ptax_recente_brl, "WDO vs PTAX mais recente")
-
 # ─────────────────────────────────────────────
 # STATUS DOS DADOS (mini painel)
 # ─────────────────────────────────────────────
-with st.expander("📡 Status dos dados — " + horario, expanded=False):
+with st.expander("📡 Status dos dados — " + snap.horario, expanded=False):
     c1, c2, c3, c4, c5 = st.columns(5)
-    c1.markdown(f"**Planilha B3** {status_badge(planilha is not None)}", unsafe_allow_html=True)
-    c2.markdown(f"**SUP_VOLB3** {status_badge(sup_volb3 is not None)}", unsafe_allow_html=True)
-    c3.markdown(f"**Ouro BRL** {status_badge(ouro_brl is not None)}", unsafe_allow_html=True)
-    c4.markdown(f"**DXY** {status_badge(dxy_var is not None)}", unsafe_allow_html=True)
-    ptax_ok = any(p is not None for p in ptax_cots)
-    c5.markdown(f"**PTAX** {status_badge(ptax_ok)}", unsafe_allow_html=True)
+    c1.markdown(f"**Planilha B3** {status_badge(snap.planilha is not None)}", unsafe_allow_html=True)
+    c2.markdown(f"**SUP_VOLB3** {status_badge(snap.sup_volb3 is not None)}", unsafe_allow_html=True)
+    c3.markdown(f"**Ouro BRL** {status_badge(snap.ouro_brl is not None)}", unsafe_allow_html=True)
+    c4.markdown(f"**DXY** {status_badge(snap.dxy_var is not None)}", unsafe_allow_html=True)
+    c5.markdown(f"**PTAX** {status_badge(snap.ptax_ok)}", unsafe_allow_html=True)
+    if dde is not None:
+        st.caption(f"Planilha via DDE local: {dde.caminho} · {dde.leituras} leitura(s)"
+                   + (f" · erro: {dde.ultimo_erro}" if dde.ultimo_erro else ""))
+    df_fontes = tabela_metricas()
+    if not df_fontes.empty:
+        st.dataframe(df_fontes, hide_index=True, use_container_width=True)
+        st.caption("p50/p95 sobre as últimas idas ao upstream · Idade = tempo desde a última busca com dado")
+    df_disjuntores = tabela_disjuntores()
+    if not df_disjuntores.empty:
+        st.dataframe(df_disjuntores, hide_index=True, use_container_width=True)
+        st.caption("Disjuntor aberto: a fonte não é consultada e responde na hora com o último "
+                   "valor bom até a próxima prova")
 
 # ─────────────────────────────────────────────
 # ABAS PRINCIPAIS
 # ─────────────────────────────────────────────
-aba1, aba2, aba3, aba4, aba5 = st.tabs([
+aba1, aba2, aba3, aba4, aba5, aba6 = st.tabs([
     "📊 Visão Geral",
     "📈 Abertura & Bandas",
     "💰 PTAX & Bandas PTAX",
     "🔗 Paridades CME/BRL",
+    "📐 Base & Termo",
     "⚙️ Ajuste Manual",
 ])
 
@@ -496,19 +329,19 @@ aba1, aba2, aba3, aba4, aba5 = st.tabs([
 with aba1:
     st.markdown("#### Métricas principais")
     m1, m2, m3, m4 = st.columns(4)
-    m1.metric("Abertura Est.",  fmt(wdo_abertura, 2),
-              delta=fmt(wdo_abertura - wdo_fut, 2) if wdo_abertura and wdo_fut else None)
-    m2.metric("Preço Justo",    fmt(preco_justo, 4))
-    m3.metric("Paridade Ouro",  fmt(paridade_ouro, 4))
-    m4.metric("Variação DXY",   f"{fmt(dxy_var, 2)}%" if dxy_var else "—")
+    m1.metric("Abertura Est.",  fmt(snap.wdo_abertura, 2),
+              delta=fmt(snap.wdo_abertura - snap.wdo_fut, 2) if snap.wdo_abertura and snap.wdo_fut else None)
+    m2.metric("Preço Justo",    fmt(snap.preco_justo, 4))
+    m3.metric("Paridade Ouro",  fmt(snap.paridade_ouro, 4))
+    m4.metric("Variação DXY",   f"{fmt(snap.dxy_var, 2)}%" if snap.dxy_var else "—")
 
     st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
 
     # ── PAINEL DE ALERTAS DE DISTORÇÃO ──────────
     st.markdown("#### 🔔 Alertas de distorção")
-    st.caption(f"Referência: WDO Fechamento Anterior ({fmt(wdo_fut,2)} pts) · "
-               f"PTAX base: {fmt(ptax_recente_brl,2) if ptax_recente_brl else '—'} "
-               f"({'PTAX ' + str([i+1 for i,p in enumerate(ptax_cots) if p is not None][-1]) if ptax_recente else 'indisponível'})")
+    st.caption(f"Referência: WDO Fechamento Anterior ({fmt(snap.wdo_fut,2)} pts) · "
+               f"PTAX base: {fmt(snap.ptax_recente_brl,2) if snap.ptax_recente_brl else '—'} "
+               f"({'PTAX ' + str(snap.ptax_recente_num) if snap.ptax_recente else 'indisponível'})")
 
     with st.expander("⚙️ Configurar limiares de alerta", expanded=False):
         ca1, ca2 = st.columns(2)
@@ -532,72 +365,107 @@ with aba1:
     except NameError:
         lim_pct = 0.20
 
-    card_alerta(dist_ouro, lim_pts, lim_pct)
-    card_alerta(dist_ptax,  lim_pts, lim_pct)
+    card_alerta(snap.dist_ouro, lim_pts, lim_pct)
+    card_alerta(snap.dist_ptax,  lim_pts, lim_pct)
 
-    if dist_ouro is None and dist_ptax is None:
+    if snap.dist_ouro is None and snap.dist_ptax is None:
         st.info("Dados insuficientes para calcular distorções. Verifique o status dos dados acima.")
 
+    # ── Monitor incremental (estado por par, eventos só nos cruzamentos) ──
+    if "monitor_distorcao" not in st.session_state:
+        st.session_state["monitor_distorcao"] = MonitorDistorcao(lim_pts, lim_pct)
+    monitor = st.session_state["monitor_distorcao"]
+    novos = monitor.definir_limiares(lim_pts, lim_pct)
+    novos += monitor.alimentar_snapshot(snap)
+    if st.session_state.get("intraday"):
+        atualizar_todos()
+        novos += monitor.alimentar_intraday(ultimo_intraday, snap.ouro_brl)
+    for ev in novos:
+        st.toast(f"{'⚠' if ev.alerta else '✓'} {PARES[ev.par]}: "
+                 f"{ev.distorcao['desvio_pts']:+.2f} pts ({ev.distorcao['desvio_pct']:+.4f}%)")
+
+    with st.expander("📟 Monitor de distorções por par", expanded=False):
+        estado = monitor.estado()
+        if estado:
+            st.dataframe(pd.DataFrame([
+                {"Par": d["label"], "Paridade": d["paridade"], "Desvio (pts)": d["desvio_pts"],
+                 "Desvio (%)": d["desvio_pct"], "Status": "⚠ DISTORÇÃO" if d["alerta"] else "✓ OK"}
+                for d in estado.values()
+            ]), hide_index=True, use_container_width=True)
+        if monitor.eventos:
+            st.caption("Últimos cruzamentos")
+            for ev in list(monitor.eventos)[-10:][::-1]:
+                st.caption(f"{ev.instante:%H:%M:%S} · {PARES[ev.par]} · "
+                           f"{'entrou em distorção' if ev.alerta else 'voltou ao normal'}")
+
     st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
 
     with st.expander("📄 Dados da planilha B3", expanded=False):
-        if planilha:
-            labels = {
-                "wdo_fut":                 "WDO Futuro — Fechamento Anterior",
-                "dolar_spot":              "Dólar Spot — Fechamento Anterior",
-                "di1_fut":                 "DI1 Futuro (taxa a.a.)",
-                "frp0":                    "FRP0 — Último",
-                "expiration_date":         "Vencimento WDO",
-                "business_days_remaining": "Dias Úteis até Vencimento",
-            }
-            rows = [{"Descrição": labels.get(k, k), "Valor": str(v)} for k, v in planilha.items()]
-            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        if snap.df_planilha is not None:
+            st.dataframe(snap.df_planilha, hide_index=True, use_container_width=True)
         else:
             st.warning("Dados da planilha não disponíveis.")
 
     with st.expander("🥇 Ouro — valores em USD e BRL", expanded=False):
         c1, c2 = st.columns(2)
-        c1.metric("Ouro Spot (USD/oz)", fmt(xauusd,   2))
-        c2.metric("Ouro (R$/grama)",    fmt(ouro_brl, 2))
+        c1.metric("Ouro Spot (USD/oz)", fmt(snap.xauusd,   2))
+        c2.metric("Ouro (R$/grama)",    fmt(snap.ouro_brl, 2))
 
     with st.expander("📐 Over (DI1 acumulado)", expanded=False):
-        st.metric("Over", fmt(over, 6))
+        st.metric("Over", fmt(snap.over, 6))
 
     with st.expander("📅 Vencimento do contrato", expanded=False):
         c1, c2 = st.columns(2)
-        c1.metric("Próximo vencimento",   venc_str)
-        c2.metric("Dias úteis restantes", f"{du} du" if du else "—")
+        c1.metric("Próximo vencimento",   snap.venc_str)
+        c2.metric("Dias úteis restantes", f"{snap.du} du" if snap.du else "—")
 
 # ══════════════════════════════════════════════
 # ABA 2 — ABERTURA & BANDAS
 # ══════════════════════════════════════════════
 with aba2:
-    st.metric("Abertura WDO estimada", fmt(wdo_abertura, 2),
-              delta=fmt(wdo_abertura - wdo_fut, 2) if wdo_abertura and wdo_fut else None)
+    st.metric("Abertura WDO estimada", fmt(snap.wdo_abertura, 2),
+              delta=fmt(snap.wdo_abertura - snap.wdo_fut, 2) if snap.wdo_abertura and snap.wdo_fut else None)
 
     st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
     st.markdown("#### Máximas e Mínimas")
 
-    if bandas:
-        df_b = pd.DataFrame({
-            "Tipo":        ["1ª Máxima", "1ª Mínima", "2ª Máxima", "2ª Mínima"],
-            "Valor (pts)": [bandas["1ª Máxima"], bandas["1ª Mínima"],
-                            bandas["2ª Máxima"], bandas["2ª Mínima"]],
-            "Distância":   [round(bandas["1ª Máxima"] - wdo_abertura, 2),
-                            round(bandas["1ª Mínima"] - wdo_abertura, 2),
-                            round(bandas["2ª Máxima"] - wdo_abertura, 2),
-                            round(bandas["2ª Mínima"] - wdo_abertura, 2)],
-        })
-        st.dataframe(colorir_bandas(df_b), hide_index=True, use_container_width=True)
+    fonte_vol = st.radio("Deslocamento por", list(FONTES_VOL), format_func=FONTES_VOL.get,
+                         horizontal=True, key="fonte_vol")
+    if fonte_vol == "planilha":
+        df_bandas = snap.df_bandas
+    else:
+        if fonte_vol == "diaria":
+            est = vol_de_serie(fechamentos(TICKERS["brl_usd"]))
+        else:
+            if st.session_state.get("intraday"):
+                atualizar_todos()
+            est = vol_intraday(TICKERS["brl_usd"])
+        c1, c2, c3 = st.columns(3)
+        c1.metric("SUP_VOLB3 (planilha)", fmt(snap.sup_volb3, 4))
+        c2.metric("Vol EWMA (% a.a.)",    fmt(est.vol_ewma, 4))
+        c3.metric("Vol Welford (% a.a.)", fmt(est.vol_welford, 4), help=f"{est.n} retornos")
+        b_din = calc_bandas(snap.wdo_abertura, snap.over, snap.sup_volb3, vol_dinamica=est.vol_ewma)
+        df_bandas = tabela_bandas(b_din, snap.wdo_abertura) if est.vol_ewma is not None else None
+
+    if df_bandas is not None:
+        st.dataframe(colorir_bandas(df_bandas), hide_index=True, use_container_width=True)
     else:
         st.warning("Dados insuficientes para calcular as bandas. Verifique a aba ⚙️ Ajuste Manual.")
 
+    st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
+    st.markdown("#### Escada de vencimentos")
+    if snap.escada is not None:
+        st.caption("Referência dos vencimentos seguintes = abertura estimada carregada pelo "
+                   "diferencial de over (a planilha só traz o WDOFUT).")
+        st.dataframe(snap.escada, hide_index=True, use_container_width=True)
+    else:
+        st.info("Sem DI1 na planilha: não há como calcular o over por vencimento.")
+
 # ══════════════════════════════════════════════
 # ABA 3 — PTAX & BANDAS PTAX
 # ══════════════════════════════════════════════
 with aba3:
-    ptax_validas = [p for p in ptax_cots if p is not None]
-    qtde         = len(ptax_validas)
+    qtde = len(snap.ptax)
 
     c1, c2 = st.columns([3, 1])
     with c1:
@@ -611,11 +479,12 @@ with aba3:
     else:
         st.success("✅ Todas as cotações PTAX do dia disponíveis.")
 
-    if ptax_validas:
-        cols = st.columns(4)
-        for i, (col, p) in enumerate(zip(cols, ptax_cots)):
+    if snap.ptax_ok:
+        cotacoes = snap.ptax.to_dict("records")
+        for i, col in enumerate(st.columns(4)):
             with col:
-                if p:
+                if i < qtde:
+                    p = cotacoes[i]
                     st.metric(
                         f"PTAX {i+1}",
                         f"R$ {p['valor']:.4f}",
@@ -627,113 +496,138 @@ with aba3:
     st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
     st.markdown("#### Bandas PTAX calculadas")
 
-    if bandas_ptax and ptax_validas:
+    if snap.df_bandas_ptax is not None:
         c1, c2 = st.columns(2)
-        c1.metric("Deslocamento (valor)", fmt(bandas_ptax["deslocamento_val"], 5))
-        c2.metric("Deslocamento (pontos)", fmt(bandas_ptax["deslocamento_pts"], 4))
-
-        tipos = ["1ª Máxima", "1ª Mínima", "2ª Máxima", "2ª Mínima"]
-        dados = {"Tipo": tipos}
-        for i, p in enumerate(bandas_ptax["ptaxes"]):
-            if p is None:
-                continue
-            dados[f"PTAX {i+1} ({p['hora']})"] = [p[t] for t in tipos]
-
-        df_pb = pd.DataFrame(dados)
-        st.dataframe(colorir_bandas(df_pb), hide_index=True, use_container_width=True)
+        c1.metric("Deslocamento (valor)", fmt(snap.bandas_ptax["deslocamento_val"], 5))
+        c2.metric("Deslocamento (pontos)", fmt(snap.bandas_ptax["deslocamento_pts"], 4))
+        st.dataframe(colorir_bandas(snap.df_bandas_ptax), hide_index=True, use_container_width=True)
     else:
         st.warning("Dados insuficientes para as bandas PTAX. Verifique a aba ⚙️ Ajuste Manual.")
 
+    st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
+    st.markdown("#### PTAX de outras moedas")
+
+    if snap.paridades_ptax is not None:
+        st.dataframe(snap.paridades_ptax, hide_index=True, use_container_width=True)
+        st.caption("Moeda/USD: dólares por unidade da moeda, pela razão das PTAX em R$. "
+                   "Moedas em WDO_PTAX_MOEDAS.")
+        with st.expander("Paridades cruzadas (linha → coluna)"):
+            st.dataframe(snap.cruzadas_ptax, use_container_width=True)
+        if snap.bandas_ptax_moedas is not None:
+            f = frame_bandas_ptax(snap.ptax_moedas, snap.bandas_ptax_moedas)
+            st.dataframe(f.drop(columns=["data_hora", "data", "tipo_boletim"])
+                          .rename(columns={"moeda": "Moeda", "hora": "Hora", "valor": "PTAX (R$)"}),
+                         hide_index=True, use_container_width=True)
+            st.caption("Bandas em pontos de cada moeda; o deslocamento do WDO é "
+                       "escalado pela paridade contra o dólar.")
+    else:
+        st.info("Nenhuma PTAX de outras moedas disponível.")
+
+    with st.expander("🗄️ Histórico PTAX (base local)"):
+        dias = st.slider("Dias", 5, 90, 30, key="dias_ptax")
+        hist = ptax_periodo(pd.Timestamp.today().date() - pd.Timedelta(days=dias),
+                            pd.Timestamp.today().date())
+        if hist.empty:
+            st.info("Nenhuma cotação guardada ainda.")
+        else:
+            fech = hist[hist["tipo_boletim"] == "Fechamento"]
+            st.line_chart(fech.set_index("data_hora")["cotacao_venda"], height=220)
+            st.caption(f"{len(hist)} janelas em {hist['data_hora'].dt.date.nunique()} dias")
+
 # ══════════════════════════════════════════════
 # ABA 4 — PARIDADES CME / BRL
 # ══════════════════════════════════════════════
 with aba4:
-    def cme_to_brl(v):
-        return round(1 / v * 1000, 2) if v and v != 0 else None
-
-    def inv(v):
-        return round(1 / v, 4) if v and v != 0 else None
-
     col_cme, col_brl = st.columns(2)
 
     # ── CME 6L=F ─────────────────────────────
     with col_cme:
         st.markdown("#### CME — 6L=F")
-        if cme_d:
-            cme_open_brl  = cme_to_brl(cme_d["open"])
-            cme_high_brl  = cme_to_brl(cme_d["low"])
-            cme_low_brl   = cme_to_brl(cme_d["high"])
-            cme_close_brl = cme_to_brl(cme_d["close"])
-            cme_prev_brl  = cme_to_brl(cme_d["prev"])
-            delta_cme     = round(cme_close_brl - cme_prev_brl, 2) if cme_close_brl and cme_prev_brl else None
-
-            df_cme = pd.DataFrame({
-                "Campo":        ["Abertura", "Máxima", "Mínima", "Fechamento", "Fech. Anterior"],
-                "USD":          [fmt(cme_d["open"],6), fmt(cme_d["high"],6),
-                                 fmt(cme_d["low"],6),  fmt(cme_d["close"],6), fmt(cme_d["prev"],6)],
-                "BRL pts":      [fmt(cme_open_brl,2), fmt(cme_high_brl,2),
-                                 fmt(cme_low_brl,2),   fmt(cme_close_brl,2), fmt(cme_prev_brl,2)],
-            })
-            st.dataframe(df_cme, hide_index=True, use_container_width=True)
-            st.metric("Δ Fechamento", fmt(delta_cme, 2) if delta_cme else "—",
-                      delta=fmt(delta_cme, 2) if delta_cme else None)
+        if snap.df_cme is not None:
+            st.dataframe(snap.df_cme, hide_index=True, use_container_width=True)
+            st.metric("Δ Fechamento", fmt(snap.delta_cme, 2) if snap.delta_cme else "—",
+                      delta=fmt(snap.delta_cme, 2) if snap.delta_cme else None)
         else:
             st.warning("Dados CME não disponíveis.")
 
     # ── BRL/USD ──────────────────────────────
     with col_brl:
         st.markdown("#### USD/BRL")
-        if brlusd_d:
-            usd_open  = inv(brlusd_d["open"])
-            usd_high  = inv(brlusd_d["low"])
-            usd_low   = inv(brlusd_d["high"])
-            usd_close = inv(brlusd_d["close"])
-            usd_prev  = inv(brlusd_d["prev"])
-            delta_usd = round(usd_close - usd_prev, 4) if usd_close and usd_prev else None
-
-            df_brl = pd.DataFrame({
-                "Campo":   ["Abertura", "Máxima", "Mínima", "Fechamento", "Fech. Anterior"],
-                "BRLUSD":  [fmt(brlusd_d["open"],6), fmt(brlusd_d["high"],6),
-                            fmt(brlusd_d["low"],6),   fmt(brlusd_d["close"],6), fmt(brlusd_d["prev"],6)],
-                "USD/BRL": [fmt(usd_open,4), fmt(usd_high,4),
-                            fmt(usd_low,4),  fmt(usd_close,4), fmt(usd_prev,4)],
-            })
-            st.dataframe(df_brl, hide_index=True, use_container_width=True)
-            st.metric("Δ Fechamento", fmt(delta_usd, 4) if delta_usd else "—",
-                      delta=fmt(delta_usd, 4) if delta_usd else None)
+        if snap.df_brl is not None:
+            st.dataframe(snap.df_brl, hide_index=True, use_container_width=True)
+            st.metric("Δ Fechamento", fmt(snap.delta_usd, 4) if snap.delta_usd else "—",
+                      delta=fmt(snap.delta_usd, 4) if snap.delta_usd else None)
         else:
             st.warning("Dados BRL/USD não disponíveis.")
 
     st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
     st.markdown("#### DXY — Índice do Dólar")
-    dxy_d = buscar_yfinance(TICKERS["dxy"])
+    dxy_d = snap.dxy_d
     if dxy_d:
         c1, c2, c3, c4, c5 = st.columns(5)
         c1.metric("Abertura",   fmt(dxy_d["open"],  3))
         c2.metric("Máxima",     fmt(dxy_d["high"],  3))
         c3.metric("Mínima",     fmt(dxy_d["low"],   3))
         c4.metric("Fechamento", fmt(dxy_d["close"], 3))
-        c5.metric("Variação",   f"{fmt(dxy_var, 2)}%" if dxy_var else "—")
+        c5.metric("Variação",   f"{fmt(snap.dxy_var, 2)}%" if snap.dxy_var else "—")
     else:
         st.warning("Dados DXY não disponíveis.")
 
+    # ── Intraday (barras de 1 min) ───────────
+    st.markdown("<hr style='border-color:#30363d'>", unsafe_allow_html=True)
+    if st.toggle("📡 Acompanhar intraday (barras de 1 min)", value=False, key="intraday"):
+        atualizar_todos()
+        df_intra = paridades_intraday(snap.wdo_fut, dxy_d["prev"] if dxy_d else None)
+        if df_intra is not None:
+            ult = df_intra.iloc[-1]
+            cols = st.columns(len(df_intra.columns))
+            for col, nome in zip(cols, df_intra.columns):
+                col.metric(nome, fmt(ult[nome], 2))
+            st.line_chart(df_intra, height=260)
+            st.caption(f"Última barra: {df_intra.index[-1]:%H:%M} (BRT) · {len(df_intra)} barras")
+        else:
+            st.info("Sem barras intraday disponíveis no momento.")
+
 # ══════════════════════════════════════════════
-# ABA 5 — AJUSTE MANUAL
+# ABA 5 — BASE SPOT/FUTURO & PONTOS A TERMO
 # ══════════════════════════════════════════════
 with aba5:
+    bt = snap.base_termo
+    if bt is None:
+        st.info("Sem a escada de vencimentos (DI1 ausente) não há base por vencimento.")
+    elif bt[["Spot (pts)", "Futuro (pts)"]].isna().any(axis=None):
+        st.warning("Dólar spot ou WDOFUT ausente na planilha: base e carry implícito indisponíveis.")
+        st.dataframe(bt, hide_index=True, use_container_width=True)
+    else:
+        frente = bt.iloc[0]
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Base spot/futuro", fmt(frente["Base (pts)"], 2),
+                  delta=fmt(frente["Base (pts)"] - frente["Base justa (pts)"], 2),
+                  help="Futuro − spot; o delta é a diferença para a base justa (over do DI1).")
+        c2.metric("Carry implícito", f"{fmt(frente['Carry implícito (%)'], 4)}%",
+                  delta=f"{fmt(frente['Carry − Over (p.p.)'], 4)} p.p. vs over")
+        c3.metric("FRP0", fmt(snap.frp0, 2))
+        c4.metric("Futuro − Forward FRP0", fmt(frente["Futuro − Forward (pts)"], 2))
+        st.caption(f"Vencimento de referência: {frente['Contrato']} · {int(frente['DU'])} dias úteis")
+        st.dataframe(bt, hide_index=True, use_container_width=True)
+
+# ══════════════════════════════════════════════
+# ABA 6 — AJUSTE MANUAL
+# ══════════════════════════════════════════════
+with aba6:
     st.markdown("#### Sobrescrever valores para recalcular")
     st.caption("Use esta aba se algum dado automático estiver incorreto ou indisponível.")
 
     with st.form("form_manual"):
         c1, c2 = st.columns(2)
         with c1:
-            m_wdo    = st.number_input("WDO Futuro — Fechamento Ant.", value=float(wdo_fut or 0), format="%.2f")
-            m_spot   = st.number_input("Dólar Spot",                   value=float(dolar_spot or 0), format="%.4f")
-            m_di1    = st.number_input("DI1 Futuro (taxa a.a.)",       value=float(di1_fut or 0), format="%.5f")
+            m_wdo    = st.number_input("WDO Futuro — Fechamento Ant.", value=float(snap.wdo_fut or 0), format="%.2f")
+            m_spot   = st.number_input("Dólar Spot",                   value=float(snap.dolar_spot or 0), format="%.4f")
+            m_di1    = st.number_input("DI1 Futuro (taxa a.a.)",       value=float(snap.di1_fut or 0), format="%.5f")
         with c2:
-            m_dxy    = st.number_input("Variação DXY (%)",             value=float(dxy_var or 0), format="%.4f")
-            m_du     = st.number_input("Dias Úteis até Vencimento",    value=int(du or 0), step=1)
-            m_sup    = st.number_input("SUP_VOLB3",                    value=float(sup_volb3 or 0), format="%.4f")
+            m_dxy    = st.number_input("Variação DXY (%)",             value=float(snap.dxy_var or 0), format="%.4f")
+            m_du     = st.number_input("Dias Úteis até Vencimento",    value=int(snap.du or 0), step=1)
+            m_sup    = st.number_input("SUP_VOLB3",                    value=float(snap.sup_volb3 or 0), format="%.4f")
         submitted = st.form_submit_button("Recalcular com valores manuais", use_container_width=True)
 
     if submitted:
@@ -762,7 +656,10 @@ with aba5:
 st.markdown(f"""
 <div style='margin-top:32px;padding-top:12px;border-top:1px solid #30363d;text-align:center'>
     <p style='font-size:11px;color:#6e7681;font-family:JetBrains Mono'>
-        WDO Calculator · dados atualizados em {horario} (BRT) ·
+        WDO Calculator · dados atualizados em {snap.horario} (BRT) ·
     </p>
 </div>
 """, unsafe_allow_html=True)
+
+registrar_rerun(time.perf_counter() - inicio_rerun)
+encerrar_perfil(perfil)
@@ -0,0 +1,275 @@
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# O PTAX do benchmark grava num SQLite descartável, nunca em dados/
+os.environ.setdefault("WDO_PTAX_DB", os.path.join(tempfile.mkdtemp(prefix="wdo-bench-"), "ptax.sqlite3"))
+
+import numpy as np
+import pandas as pd
+from streamlit.logger import set_log_level
+
+set_log_level("error")       # sem runtime o st.cache_data avisa a cada função decorada
+
+from wdo_calc import (
+    calc_abertura_wdo, calc_over, calc_preco_justo, calc_bandas, calc_bandas_ptax,
+    vencimentos_wdo, dias_uteis, calc_escada_wdo, calc_base_wdo,
+    calc_paridades_ptax, matriz_cruzada, calc_bandas_ptax_moedas,
+)
+from wdo_sources import (
+    TICKERS, URL_OURO_BRL, URL_PLANILHA, HEADERS,
+    ler_planilha, ler_sup_volb3, ler_ouro_brl, resumo_diario, variacao_fechamento, frame_ptax,
+)
+from ptax_store import gravar, ptax_ultimo_dia, ptax_ultimo_dia_moedas
+from market_snapshot import montar_snapshot
+
+# ─────────────────────────────────────────────
+# Benchmark offline — cálculos e loaders sobre fixtures gravadas
+# ─────────────────────────────────────────────
+# Uso:
+#   python bench.py                      roda e compara com fixtures/baseline.json
+#   python bench.py --salvar-baseline    roda e grava o baseline
+#   python bench.py --gravar-fixtures    baixa payloads novos (precisa de rede)
+#
+# Cada caso devolve um resultado; se ele mudar em relação ao baseline o caso é
+# marcado DIVERGE (mudou o número, não só o tempo). O tempo comparado é o
+# mínimo das rodadas (menos sensível à carga da máquina); acima de
+# baseline × (1 + tolerância) o caso é marcado LENTO. Qualquer um dos dois sai com 1.
+
+DIR_FIXTURES  = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BASELINE      = os.path.join(DIR_FIXTURES, "baseline.json")
+TOLERANCIA    = 0.50      # a máquina de quem roda varia; baseline é por máquina
+PISO_US       = 5.0       # diferenças menores que isso são ruído de medição
+ORCAMENTO_SEG = 0.2       # tempo mínimo de medição por rodada
+RODADAS       = 5
+DU_FIXO       = 10        # ler_planilha calcula dias úteis a partir de hoje
+HOJE_FIXO     = datetime(2026, 3, 20)     # idem para a escada de vencimentos
+FATOR_EUR     = 1.08                      # EUR sintético (USD × fator): não há fixture do BCB para EUR
+
+
+def _fixture(*partes) -> str:
+    return os.path.join(DIR_FIXTURES, *partes)
+
+# ─────────────────────────────────────────────
+# Carga das fixtures
+# ─────────────────────────────────────────────
+def carregar_fixtures() -> dict:
+    yahoo = {}
+    for tk in TICKERS.values():
+        df = pd.read_csv(_fixture("yahoo", f"{tk}.csv"), index_col="Date")
+        df.index = pd.to_datetime(df.index, utc=True)
+        yahoo[tk] = df
+    with open(_fixture("bcb_ptax_usd.json"), encoding="utf-8") as f:
+        bcb = pd.DataFrame(json.load(f)["value"])
+    with open(_fixture("melhorcambio_ouro.html"), "rb") as f:
+        html = f.read()
+    with open(_fixture("ddeprofit.xlsx"), "rb") as f:
+        xlsx = f.read()
+    return {"yahoo": yahoo, "bcb": bcb, "html": html, "xlsx": xlsx}
+
+
+def gravar_fixtures():
+    """Substitui as fixtures por payloads baixados agora."""
+    import requests
+    import yfinance as yf
+
+    os.makedirs(_fixture("yahoo"), exist_ok=True)
+    r = requests.get(URL_PLANILHA, timeout=15)
+    r.raise_for_status()
+    with open(_fixture("ddeprofit.xlsx"), "wb") as f:
+        f.write(r.content)
+
+    for tk in TICKERS.values():
+        yf.Ticker(tk).history(period="5d").to_csv(_fixture("yahoo", f"{tk}.csv"))
+
+    fim, inicio = date.today(), date.today() - timedelta(days=28)
+    url = ("https://olinda.bcb.gov.br/olinda/servico/PTAX/versao/v1/odata/"
+           "CotacaoMoedaPeriodo(moeda=@moeda,dataInicial=@dataInicial,dataFinalCotacao=@dataFinalCotacao)"
+           f"?@moeda='USD'&@dataInicial='{inicio:%m-%d-%Y}'&@dataFinalCotacao='{fim:%m-%d-%Y}'&$format=json")
+    r = requests.get(url, timeout=15)
+    r.raise_for_status()
+    with open(_fixture("bcb_ptax_usd.json"), "w", encoding="utf-8") as f:
+        json.dump(r.json(), f, ensure_ascii=False, indent=1)
+
+    r = requests.get(URL_OURO_BRL, headers=HEADERS, timeout=10)
+    r.raise_for_status()
+    with open(_fixture("melhorcambio_ouro.html"), "wb") as f:
+        f.write(r.content)
+
+# ─────────────────────────────────────────────
+# Casos
+# ─────────────────────────────────────────────
+def montar_casos(fx: dict) -> dict:
+    """nome → função sem argumentos que devolve um resultado comparável."""
+    planilha = dict(ler_planilha(io.BytesIO(fx["xlsx"])), business_days_remaining=DU_FIXO)
+    indice = planilha["ativos"]
+    sup_volb3 = ler_sup_volb3(io.BytesIO(fx["xlsx"]))
+    yahoo = fx["yahoo"]
+    dxy_var = variacao_fechamento(yahoo[TICKERS["dxy"]])
+
+    gravar("USD", fx["bcb"])
+    gravar("EUR", fx["bcb"].assign(cotacaoCompra=fx["bcb"]["cotacaoCompra"] * FATOR_EUR,
+                                   cotacaoVenda=fx["bcb"]["cotacaoVenda"] * FATOR_EUR))
+    ptax = frame_ptax(ptax_ultimo_dia("USD", date(2100, 1, 1)))
+    ptax_moedas = frame_ptax(ptax_ultimo_dia_moedas(["USD", "EUR"], date(2100, 1, 1)))
+
+    wdo_abertura = calc_abertura_wdo(planilha["wdo_fut"], dxy_var)
+    over = calc_over(planilha["di1_fut"], DU_FIXO)
+    vencs = vencimentos_wdo(HOJE_FIXO, 3)
+    escada = calc_escada_wdo(vencs, dias_uteis(HOJE_FIXO, vencs), wdo_abertura,
+                             planilha["dolar_spot"], planilha["di1_fut"], sup_volb3)
+
+    def sem_data(d):
+        return {k: v for k, v in d.items() if k not in ("expiration_date", "business_days_remaining", "ativos")}
+
+    def ptax_ida_e_volta():
+        gravar("USD", fx["bcb"])
+        return frame_ptax(ptax_ultimo_dia("USD", date(2100, 1, 1)))
+
+    def snapshot():
+        s = montar_snapshot(planilha, sup_volb3, resumo_diario(yahoo[TICKERS["xauusd"]]),
+                            ler_ouro_brl(fx["html"]), dxy_var, resumo_diario(yahoo[TICKERS["dxy"]]),
+                            resumo_diario(yahoo[TICKERS["cme"]]), resumo_diario(yahoo[TICKERS["brl_usd"]]),
+                            ptax)
+        return [s.wdo_abertura, s.over, s.preco_justo, s.paridade_ouro, s.bandas, s.bandas_ptax]
+
+    def ptax_moedas_calc():
+        paridades = calc_paridades_ptax(ptax_moedas)
+        bandas = calc_bandas_ptax_moedas(wdo_abertura, over, sup_volb3, ptax_moedas, paridades)
+        return [paridades, matriz_cruzada(paridades).reset_index(), bandas]
+
+    return {
+        "calc_abertura_wdo":   lambda: calc_abertura_wdo(planilha["wdo_fut"], dxy_var),
+        "calc_over":           lambda: calc_over(planilha["di1_fut"], DU_FIXO),
+        "calc_preco_justo":    lambda: calc_preco_justo(planilha["dolar_spot"], over),
+        "calc_bandas":         lambda: calc_bandas(wdo_abertura, over, sup_volb3),
+        "calc_bandas_ptax":    lambda: calc_bandas_ptax(wdo_abertura, over, sup_volb3, ptax),
+        "calc_escada_wdo":     lambda: calc_escada_wdo(vencs, dias_uteis(HOJE_FIXO, vencs), wdo_abertura,
+                                                       planilha["dolar_spot"], planilha["di1_fut"], sup_volb3),
+        "calc_base_wdo":       lambda: calc_base_wdo(escada, planilha["dolar_spot"], planilha["wdo_fut"],
+                                                     planilha["frp0"]),
+        "ler_planilha":        lambda: sem_data(ler_planilha(io.BytesIO(fx["xlsx"]))),
+        "indice_consultas":    lambda: [indice.numero(a, c) for a in indice.ativos()
+                                        for c in ("Último", "Fechamento Anterior")],
+        "ler_sup_volb3":       lambda: ler_sup_volb3(io.BytesIO(fx["xlsx"])),
+        "planilha_excelfile":  lambda: _planilha_uma_abertura(fx["xlsx"], sem_data),
+        "resumo_diario_x4":    lambda: [resumo_diario(df) for df in yahoo.values()],
+        "variacao_dxy":        lambda: variacao_fechamento(yahoo[TICKERS["dxy"]]),
+        "ptax_gravar_ler":     ptax_ida_e_volta,
+        "ptax_ultimo_dia":     lambda: frame_ptax(ptax_ultimo_dia("USD", date(2100, 1, 1))),
+        "ptax_ultimo_dia_moedas": lambda: frame_ptax(ptax_ultimo_dia_moedas(["USD", "EUR"],
+                                                                            date(2100, 1, 1))),
+        "calc_ptax_moedas":    ptax_moedas_calc,
+        "ler_ouro_brl":        lambda: ler_ouro_brl(fx["html"]),
+        "montar_snapshot":     snapshot,
+    }
+
+
+def _planilha_uma_abertura(xlsx: bytes, sem_data) -> list:
+    with pd.ExcelFile(io.BytesIO(xlsx)) as xl:
+        return [sem_data(ler_planilha(xl)), ler_sup_volb3(xl)]
+
+# ─────────────────────────────────────────────
+# Medição e comparação
+# ─────────────────────────────────────────────
+def _serializar(v):
+    if isinstance(v, pd.DataFrame):
+        v = v.astype({c: str for c in v.select_dtypes("datetime").columns})
+        return v.astype(object).where(v.notna(), None).to_dict("records")     # NaN != NaN
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    return float(v)
+
+
+def _normalizar(v):
+    """Resultado em forma JSON estável (floats arredondados, DataFrames em registros)."""
+    return json.loads(json.dumps(v, default=_serializar), parse_float=lambda s: round(float(s), 8))
+
+
+def medir(func) -> dict:
+    resultado = _normalizar(func())
+    n, t = 1, 0.0
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            func()
+        t = time.perf_counter() - t0
+        if t >= ORCAMENTO_SEG / RODADAS:
+            break
+        n *= 2
+    tempos = []
+    for _ in range(RODADAS):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            func()
+        tempos.append((time.perf_counter() - t0) / n)
+    return {"mediana_us": round(statistics.median(tempos) * 1e6, 3),
+            "min_us": round(min(tempos) * 1e6, 3), "resultado": resultado}
+
+
+def rodar(filtro: str | None = None) -> dict:
+    casos = montar_casos(carregar_fixtures())
+    return {nome: medir(f) for nome, f in casos.items() if not filtro or filtro in nome}
+
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> int:
+    falhas = 0
+    print(f"{'caso':<22}{'mínimo':>14}{'baseline':>14}{'Δ':>9}  status")
+    for nome, m in atual.items():
+        b = base.get(nome)
+        if b is None:
+            print(f"{nome:<22}{m['min_us']:>12.1f}µs{'—':>14}{'':>9}  NOVO")
+            continue
+        delta = m["min_us"] / b["min_us"] - 1 if b["min_us"] else 0.0
+        if m["resultado"] != b["resultado"]:
+            status = "DIVERGE"
+        elif delta > tolerancia and m["min_us"] - b["min_us"] > PISO_US:
+            status = "LENTO"
+        else:
+            status = "ok"
+        falhas += status != "ok"
+        print(f"{nome:<22}{m['min_us']:>12.1f}µs{b['min_us']:>12.1f}µs{delta:>+9.1%}  {status}")
+    return falhas
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark offline dos cálculos e loaders do WDO.")
+    ap.add_argument("--salvar-baseline", action="store_true")
+    ap.add_argument("--gravar-fixtures", action="store_true")
+    ap.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    ap.add_argument("-k", dest="filtro", help="roda só os casos cujo nome contém o texto")
+    args = ap.parse_args(argv)
+
+    if args.gravar_fixtures:
+        gravar_fixtures()
+
+    atual = rodar(args.filtro)
+    if args.salvar_baseline:
+        base = {}
+        if os.path.exists(BASELINE):
+            with open(BASELINE, encoding="utf-8") as f:
+                base = json.load(f)
+        base.update(atual)
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(base, f, ensure_ascii=False, indent=1)
+        for nome, m in atual.items():
+            print(f"{nome:<22}{m['min_us']:>12.1f}µs  (mediana {m['mediana_us']:.1f}µs)")
+        print(f"baseline salvo em {BASELINE}")
+        return 0
+
+    if not os.path.exists(BASELINE):
+        print("sem baseline; rode com --salvar-baseline", file=sys.stderr)
+        return 1
+    with open(BASELINE, encoding="utf-8") as f:
+        base = json.load(f)
+    return 1 if comparar(atual, base, args.tolerancia) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
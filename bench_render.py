@@ -0,0 +1,298 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import pandas as pd
+import requests
+
+# ─────────────────────────────────────────────
+# Benchmark de renderização — scripts completos, sem navegador e sem rede
+# ─────────────────────────────────────────────
+# Roda appdist.py, main.py e lateral_main.py com streamlit.testing.v1.AppTest.
+# requests.get, yfinance.Ticker e bcb.PTAX são trocados por respostas montadas
+# a partir de fixtures/ (as mesmas do bench.py), então o tempo medido é o custo
+# de um rerun na UI: parsing, cálculos, Styler, tabelas e o envio dos elementos.
+#
+# Para cada app (e cada página do menu lateral, em main.py/lateral_main.py):
+#   frio   → caches do Streamlit, single-flight e snapshot zerados
+#   quente → o mesmo rerun logo em seguida (melhor de N)
+# Em appdist.py o st.tabs é envolvido para cronometrar o corpo de cada aba.
+#
+# Uso:
+#   python bench_render.py                     roda e compara com fixtures/baseline_render.json
+#   python bench_render.py --salvar-baseline
+#   python bench_render.py -k appdist          só os apps cujo nome contém o texto
+
+RAIZ          = os.path.dirname(os.path.abspath(__file__))
+DIR_FIXTURES  = os.path.join(RAIZ, "fixtures")
+BASELINE      = os.path.join(DIR_FIXTURES, "baseline_render.json")
+APPS          = ["appdist.py", "main.py", "lateral_main.py"]
+TOLERANCIA    = 0.50
+RODADAS       = 3
+TIMEOUT_SEG   = 120
+COLUNAS_YF    = ["Open", "High", "Low", "Close", "Volume"]
+
+# ─────────────────────────────────────────────
+# Upstreams servidos pelas fixtures
+# ─────────────────────────────────────────────
+def _ler(nome: str, modo: str = "rb"):
+    with open(os.path.join(DIR_FIXTURES, nome), modo) as f:
+        return f.read()
+
+
+def _ultimo_pregao(d: date) -> date:
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d
+
+
+class _Fixtures:
+    def __init__(self):
+        self.xlsx = _ler("ddeprofit.xlsx")
+        self.html = _ler("melhorcambio_ouro.html")
+        self.yahoo = {}
+        for arq in os.listdir(os.path.join(DIR_FIXTURES, "yahoo")):
+            df = pd.read_csv(os.path.join(DIR_FIXTURES, "yahoo", arq), index_col="Date")
+            df.index = pd.to_datetime(df.index, utc=True).tz_convert("America/New_York")
+            self.yahoo[arq.removesuffix(".csv")] = df
+
+        # Desloca a PTAX gravada para terminar no último pregão de hoje: os
+        # loaders antigos voltam dia a dia até achar cotação.
+        bcb = pd.DataFrame(json.loads(_ler("bcb_ptax_usd.json", "r"))["value"])
+        dh = pd.to_datetime(bcb["dataHoraCotacao"])
+        desloc = pd.Timestamp(_ultimo_pregao(date.today())) - dh.max().normalize()
+        bcb["dataHoraCotacao"] = (dh + desloc).dt.strftime("%Y-%m-%d %H:%M:%S.%f").str[:-3]
+        bcb["_data"] = (dh + desloc).dt.date
+        self.bcb = bcb
+
+
+class _Resposta(requests.Response):
+    def __init__(self, url: str, conteudo: bytes | None):
+        super().__init__()
+        self.url         = url
+        self.status_code = 200 if conteudo is not None else 404
+        self._content    = conteudo or b""
+
+
+class _TickerFixture:
+    fx: _Fixtures = None
+
+    def __init__(self, ticker: str, *args, **kwargs):
+        self.ticker = ticker
+
+    def history(self, period=None, interval="1d", start=None, end=None, **kwargs) -> pd.DataFrame:
+        df = self.fx.yahoo.get(self.ticker)
+        if df is None or interval != "1d":
+            return pd.DataFrame(columns=COLUNAS_YF)
+        return df.copy()
+
+
+class _ConsultaPTAX:
+    def __init__(self, fx: _Fixtures):
+        self.fx, self.params = fx, {}
+
+    def query(self):
+        return self
+
+    def parameters(self, **kwargs):
+        self.params = kwargs
+        return self
+
+    def collect(self) -> pd.DataFrame:
+        ini = datetime.strptime(self.params["dataInicial"], "%m.%d.%Y").date()
+        fim = datetime.strptime(self.params["dataFinalCotacao"], "%m.%d.%Y").date()
+        df = self.fx.bcb
+        return df[(df["_data"] >= ini) & (df["_data"] <= fim)].drop(columns="_data").reset_index(drop=True)
+
+
+class _PTAXFixture:
+    fx: _Fixtures = None
+
+    def get_endpoint(self, nome: str) -> _ConsultaPTAX:
+        return _ConsultaPTAX(self.fx)
+
+
+def instalar_fixtures(pasta_trabalho: str) -> _Fixtures:
+    """Troca os upstreams pelas fixtures e isola arquivos gravados pelos apps."""
+    fx = _Fixtures()
+    _TickerFixture.fx = _PTAXFixture.fx = fx
+
+    def get(url, *args, **kwargs):
+        if url.endswith("ddeprofit.xlsx"):
+            return _Resposta(url, fx.xlsx)
+        if "melhorcambio" in url:
+            return _Resposta(url, fx.html)
+        return _Resposta(url, None)
+
+    for alvo, novo in [("requests.get", get), ("yfinance.Ticker", _TickerFixture),
+                       ("bcb.PTAX", _PTAXFixture)]:
+        mock.patch(alvo, novo).start()
+
+    # buscar_planilha_github e os loaders antigos gravam ddeprofit.xlsx no cwd
+    os.chdir(pasta_trabalho)
+    os.environ["WDO_PTAX_DB"]       = os.path.join(pasta_trabalho, "ptax.sqlite3")
+    os.environ["WDO_HISTORICO_DIR"] = os.path.join(pasta_trabalho, "historico")
+    os.environ["WDO_SNAPSHOT_ARQUIVO"] = os.path.join(pasta_trabalho, "snapshot.pkl.gz")
+    for var in ("WDO_API_PORT", "WDO_DDE_ARQUIVO"):
+        os.environ.pop(var, None)
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    return fx
+
+# ─────────────────────────────────────────────
+# Cronômetro por aba (st.tabs)
+# ─────────────────────────────────────────────
+_tempo_abas: dict[str, float] = defaultdict(float)
+
+
+class _AbaCronometrada:
+    def __init__(self, dg, rotulo: str):
+        self._dg, self._rotulo, self._t0 = dg, rotulo, None
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self._dg.__enter__()
+
+    def __exit__(self, *exc):
+        res = self._dg.__exit__(*exc)
+        _tempo_abas[self._rotulo] += time.perf_counter() - self._t0
+        return res
+
+    def __getattr__(self, nome):
+        return getattr(self._dg, nome)
+
+
+def cronometrar_abas():
+    import streamlit as st
+    original = st.tabs
+
+    def tabs(rotulos, *args, **kwargs):
+        return [_AbaCronometrada(dg, r) for dg, r in zip(original(rotulos, *args, **kwargs), rotulos)]
+
+    mock.patch("streamlit.tabs", tabs).start()
+
+# ─────────────────────────────────────────────
+# Medição
+# ─────────────────────────────────────────────
+def limpar_caches():
+    import streamlit as st
+    import market_snapshot
+    from single_flight import limpar_todos
+    from circuit_breaker import limpar as limpar_disjuntores
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    limpar_todos()
+    limpar_disjuntores()
+    market_snapshot._atual = None
+    market_snapshot._disco_verificado = True      # frio = sem o snapshot salvo em disco
+
+
+def _contar_elementos(no) -> int:
+    filhos = getattr(no, "children", None)
+    if filhos is None:
+        return 1
+    return sum(_contar_elementos(f) for f in filhos.values())
+
+
+def _rodar(at) -> dict:
+    _tempo_abas.clear()
+    t0 = time.perf_counter()
+    at.run(timeout=TIMEOUT_SEG)
+    total = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    abas = {t.label: {"ms": round(_tempo_abas.get(t.label, 0.0) * 1000, 2),
+                      "elementos": _contar_elementos(t)} for t in at.tabs}
+    return {"ms": round(total * 1000, 2), "elementos": _contar_elementos(at._tree), "abas": abas}
+
+
+def _frio_e_quente(at) -> dict:
+    limpar_caches()
+    frio = _rodar(at)
+    quentes = [_rodar(at) for _ in range(RODADAS)]
+    quente = min(quentes, key=lambda r: r["ms"])
+    return {"frio_ms": frio["ms"], "quente_ms": quente["ms"], "elementos": quente["elementos"],
+            "abas": {k: {"frio_ms": frio["abas"][k]["ms"], "quente_ms": v["ms"], "elementos": v["elementos"]}
+                     for k, v in quente["abas"].items()}}
+
+
+def medir_app(script: str) -> dict:
+    """{página: medidas}; apps sem menu lateral têm uma página só ("—")."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(RAIZ, script), default_timeout=TIMEOUT_SEG)
+    limpar_caches()
+    at.run()
+    if not at.sidebar.radio:
+        return {"—": _frio_e_quente(at)}
+    paginas = {}
+    for opcao in at.sidebar.radio[0].options:
+        at.sidebar.radio[0].set_value(opcao)
+        paginas[opcao] = _frio_e_quente(at)
+    return paginas
+
+
+def rodar(filtro: str | None = None) -> dict:
+    instalar_fixtures(tempfile.mkdtemp(prefix="wdo-render-"))
+    cronometrar_abas()
+    return {app: medir_app(app) for app in APPS if not filtro or filtro in app}
+
+# ─────────────────────────────────────────────
+# Relatório e baseline
+# ─────────────────────────────────────────────
+def imprimir(res: dict, base: dict, tolerancia: float) -> int:
+    falhas = 0
+    print(f"{'app / página':<44}{'frio':>11}{'quente':>11}{'base':>11}{'elem':>6}  status")
+    for app, paginas in res.items():
+        for pag, m in paginas.items():
+            b = base.get(app, {}).get(pag)
+            status = "NOVO"
+            if b is not None:
+                status = "ok"
+                if m["elementos"] != b["elementos"]:
+                    status = f"ELEMENTOS {b['elementos']}→{m['elementos']}"
+                elif m["quente_ms"] > b["quente_ms"] * (1 + tolerancia):
+                    status = "LENTO"
+                falhas += status != "ok"
+            ref = f"{b['quente_ms']:.1f}ms" if b else "—"
+            print(f"{(app + ' · ' + pag)[:43]:<44}{m['frio_ms']:>9.1f}ms{m['quente_ms']:>9.1f}ms"
+                  f"{ref:>11}{m['elementos']:>6}  {status}")
+            for aba, a in m["abas"].items():
+                print(f"    {aba[:39]:<40}{a['frio_ms']:>9.1f}ms{a['quente_ms']:>9.1f}ms{'':>11}{a['elementos']:>6}")
+    return falhas
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Tempo de rerun dos apps Streamlit com fixtures locais.")
+    ap.add_argument("--salvar-baseline", action="store_true")
+    ap.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    ap.add_argument("-k", dest="filtro", help="roda só os apps cujo nome contém o texto")
+    args = ap.parse_args(argv)
+    logging.disable(logging.WARNING)     # "No runtime found"/"missing ScriptRunContext" a cada rerun
+
+    base = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f:
+            base = json.load(f)
+
+    res = rodar(args.filtro)
+    falhas = imprimir(res, {} if args.salvar_baseline else base, args.tolerancia)
+    if args.salvar_baseline:
+        base.update(res)
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(base, f, ensure_ascii=False, indent=1)
+        print(f"baseline salvo em {BASELINE}")
+        return 0
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import threading
+import time
+from functools import wraps
+
+import pandas as pd
+
+# ─────────────────────────────────────────────
+# Disjuntor (circuit breaker) por fonte upstream
+# ─────────────────────────────────────────────
+#   fechado      → chamadas passam; FALHAS_PARA_ABRIR falhas seguidas abrem
+#   aberto       → nada vai ao upstream: devolve o último valor bom (ou None)
+#                  na hora, até vencer a espera
+#   meio-aberto  → vencida a espera, uma única chamada de prova passa; sucesso
+#                  fecha, falha reabre com a espera dobrada (até ESPERA_MAX)
+#
+# Os fetchers engolem exceções e devolvem None, então resultado vazio também
+# conta como falha. Fica abaixo do st.cache_data:
+#
+#   @instrumentar("Ouro BRL")
+#   @st.cache_data(...)
+#   @com_disjuntor("Ouro BRL")
+#   @na_origem
+#   def buscar_ouro_brl(): ...
+#
+# Respostas do disjuntor não podem ficar no cache (um None guardado por 5 min
+# esconderia as falhas seguintes e a espera de 30 s): aberto, ele levanta
+# DisjuntorAberto com o último valor bom; resposta vazia levanta RespostaVazia
+# com o próprio valor. Exceção atravessa o st.cache_data sem ser guardada, e o
+# instrumentar, no topo, devolve o valor carregado.
+#
+# Para código que sinaliza falha por exceção (ex. sincronização da PTAX), use
+# disjuntor(nome).chamar(func, ...), que levanta DisjuntorAberto quando aberto.
+
+FALHAS_PARA_ABRIR = 3
+ESPERA_INICIAL    = 30.0      # segundos aberto antes da primeira prova
+ESPERA_MAX        = 600.0
+
+FECHADO, ABERTO, MEIO_ABERTO = "fechado", "aberto", "meio-aberto"
+
+
+class DisjuntorAberto(Exception):
+    def __init__(self, nome: str, valor=None):
+        super().__init__(nome)
+        self.valor = valor          # último valor bom, servido no lugar da busca
+
+
+class RespostaVazia(Exception):
+    """Falha já contada no disjuntor; levantada só para o cache não guardá-la."""
+    def __init__(self, valor):
+        super().__init__("resposta vazia")
+        self.valor = valor
+
+
+def resultado_vazio(valor) -> bool:
+    if valor is None:
+        return True
+    if isinstance(valor, (list, tuple)):
+        return all(v is None for v in valor)
+    if isinstance(valor, pd.DataFrame):
+        return valor.empty
+    return False
+
+
+class Disjuntor:
+    def __init__(self, nome: str):
+        self.nome           = nome
+        self.estado         = FECHADO
+        self.falhas         = 0          # seguidas
+        self.espera         = ESPERA_INICIAL
+        self.aberto_ate     = 0.0        # time.monotonic()
+        self.ultimo_valor   = None
+        self.ultimo_sucesso = None       # time.time()
+        self.curtos         = 0          # chamadas respondidas sem ir ao upstream
+        self._prova         = False      # prova do meio-aberto em andamento
+        self._lock          = threading.Lock()
+
+    def permitir(self) -> bool:
+        """True se a chamada pode ir ao upstream (no meio-aberto, só uma)."""
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+            if self.estado == ABERTO and time.monotonic() >= self.aberto_ate:
+                self.estado = MEIO_ABERTO
+            if self.estado == MEIO_ABERTO and not self._prova:
+                self._prova = True
+                return True
+            self.curtos += 1
+            return False
+
+    def sucesso(self, valor=None):
+        with self._lock:
+            self.estado, self.falhas, self.espera, self._prova = FECHADO, 0, ESPERA_INICIAL, False
+            if valor is not None:
+                self.ultimo_valor = valor
+            self.ultimo_sucesso = time.time()
+
+    def falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self.estado == MEIO_ABERTO:
+                self.espera = min(self.espera * 2, ESPERA_MAX)
+            if self.estado == MEIO_ABERTO or self.falhas >= FALHAS_PARA_ABRIR:
+                self.estado     = ABERTO
+                self.aberto_ate = time.monotonic() + self.espera
+            self._prova = False
+
+    def liberar(self):
+        """Devolve a vez de prova do meio-aberto sem ter chamado o upstream."""
+        with self._lock:
+            self._prova = False
+
+    def proxima_prova(self) -> float | None:
+        """Segundos até a próxima prova (None se fechado)."""
+        if self.estado == FECHADO:
+            return None
+        return max(0.0, self.aberto_ate - time.monotonic())
+
+    def chamar(self, func, *args, **kwargs):
+        """Executa `func` pelo disjuntor; exceção conta como falha."""
+        if not self.permitir():
+            raise DisjuntorAberto(self.nome)
+        try:
+            valor = func(*args, **kwargs)
+        except BaseException:
+            self.falha()
+            raise
+        self.sucesso()
+        return valor
+
+
+_disjuntores: dict[str, Disjuntor] = {}
+_lock = threading.Lock()
+
+
+def disjuntor(nome: str) -> Disjuntor:
+    with _lock:
+        d = _disjuntores.get(nome)
+        if d is None:
+            d = _disjuntores[nome] = Disjuntor(nome)
+        return d
+
+
+def com_disjuntor(nome: str):
+    """Decorator para fetchers que devolvem None/vazio em caso de falha.
+    `nome` aceita {0}, {1}… dos argumentos (um disjuntor por ticker, p.ex.)."""
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            d = disjuntor(nome.format(*args))
+            if not d.permitir():
+                raise DisjuntorAberto(d.nome, d.ultimo_valor)
+            try:
+                valor = func(*args, **kwargs)
+            except BaseException:
+                d.falha()
+                raise
+            if resultado_vazio(valor):
+                d.falha()
+                raise RespostaVazia(valor)
+            d.sucesso(valor)
+            return valor
+
+        return wrapper
+    return decorador
+
+
+def disjuntores() -> list[Disjuntor]:
+    with _lock:
+        return list(_disjuntores.values())
+
+
+def tabela_disjuntores() -> pd.DataFrame:
+    """DataFrame para o painel de status (um disjuntor por linha)."""
+    icones = {FECHADO: "🟢 fechado", MEIO_ABERTO: "🟡 meio-aberto", ABERTO: "🔴 aberto"}
+    linhas = [{
+        "Fonte":               d.nome,
+        "Estado":              icones[d.estado],
+        "Falhas seguidas":     d.falhas,
+        "Próxima prova (s)":   None if d.proxima_prova() is None else round(d.proxima_prova()),
+        "Curto-circuitos":     d.curtos,
+        "Último sucesso (s)":  None if d.ultimo_sucesso is None else round(time.time() - d.ultimo_sucesso),
+    } for d in disjuntores()]
+    return pd.DataFrame(linhas)
+
+
+def limpar():
+    with _lock:
+        _disjuntores.clear()
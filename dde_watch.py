@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from market_snapshot import definir_planilha_local
+from wdo_sources import ler_planilha, ler_sup_volb3
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:          # opcional; sem ele cai no polling por mtime
+    INotify = None
+
+# ─────────────────────────────────────────────
+# Ingestão do ddeprofit.xlsx local (link DDE do Profit)
+# ─────────────────────────────────────────────
+# Observa o arquivo gravado pelo Profit e, a cada mudança real (mtime/tamanho),
+# relê a planilha e publica WDOFUT / USD/BRL / DI1FUT / FRP0 e SUP_VOLB3 no
+# snapshot compartilhado. Usa inotify quando disponível (Linux, pacote
+# inotify_simple); senão faz polling barato de os.stat.
+#
+# Ative com WDO_DDE_ARQUIVO=/caminho/ddeprofit.xlsx.
+
+INTERVALO_POLL = 0.25        # segundos
+ESPERA_ESCRITA = 0.10        # o Excel grava em rajadas; espera assentar
+
+
+def arquivo_configurado() -> str | None:
+    return os.environ.get("WDO_DDE_ARQUIVO") or None
+
+
+class ObservadorDDE:
+    """Relê a planilha local quando ela muda e publica no snapshot."""
+
+    def __init__(self, caminho: str, intervalo: float = INTERVALO_POLL):
+        self.caminho      = os.path.abspath(caminho)
+        self.intervalo    = intervalo
+        self.assinatura   = None     # (mtime_ns, tamanho) da última leitura bem-sucedida
+        self.leituras     = 0
+        self.ultimo_erro  = None
+        self.ultima_carga = None
+        self._parar       = threading.Event()
+
+    def _assinatura_atual(self):
+        try:
+            st_ = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None
+        return (st_.st_mtime_ns, st_.st_size)
+
+    def verificar(self) -> bool:
+        """Relê se o arquivo mudou desde a última leitura. True se publicou."""
+        assinatura = self._assinatura_atual()
+        if assinatura is None or assinatura == self.assinatura:
+            return False
+        try:
+            with pd.ExcelFile(self.caminho) as xl:
+                planilha  = ler_planilha(xl)
+                sup_volb3 = ler_sup_volb3(xl)
+        except Exception as e:
+            # arquivo em gravação/travado: tenta de novo no próximo ciclo
+            self.ultimo_erro = str(e)
+            return False
+        self.assinatura   = assinatura
+        self.leituras    += 1
+        self.ultimo_erro  = None
+        self.ultima_carga = time.time()
+        definir_planilha_local(planilha, sup_volb3)
+        return True
+
+    def _loop_poll(self):
+        while not self._parar.is_set():
+            self.verificar()
+            self._parar.wait(self.intervalo)
+
+    def _loop_inotify(self):
+        ino   = INotify()
+        pasta = os.path.dirname(self.caminho)
+        nome  = os.path.basename(self.caminho)
+        ino.add_watch(pasta, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE)
+        self.verificar()
+        while not self._parar.is_set():
+            eventos = ino.read(timeout=int(self.intervalo * 4000))
+            if any(ev.name == nome for ev in eventos):
+                time.sleep(ESPERA_ESCRITA)
+                self.verificar()
+            elif not eventos and self.ultimo_erro:
+                self.verificar()
+
+    def iniciar(self) -> "ObservadorDDE":
+        alvo = self._loop_inotify if INotify is not None else self._loop_poll
+        threading.Thread(target=alvo, name="wdo-dde-watch", daemon=True).start()
+        return self
+
+    def parar(self):
+        self._parar.set()
@@ -0,0 +1,137 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+from wdo_calc import TZ, calc_distorcao, calc_paridade_ouro, cme_to_brl, em_distorcao, em_pontos
+from wdo_sources import TICKERS
+
+# ─────────────────────────────────────────────
+# Monitor de distorções — avaliação incremental
+# ─────────────────────────────────────────────
+# Guarda a última paridade e o último estado (em alerta ou não) de cada par.
+# Uma cotação nova reavalia só o par dela; mudar a referência ou os limiares
+# reavalia todos. Eventos só são emitidos quando o estado do par muda.
+
+PARES = {
+    "ouro":        "WDO vs Paridade Ouro",
+    "ptax":        "WDO vs PTAX mais recente",
+    "cme":         "WDO vs CME 6L",
+    "brl_usd":     "WDO vs USD/BRL",
+    "preco_justo": "WDO vs Preço Justo",
+}
+
+
+@dataclass(frozen=True)
+class EventoDistorcao:
+    par:       str
+    alerta:    bool        # True = entrou em distorção; False = voltou ao normal
+    distorcao: dict
+    instante:  datetime
+
+
+class MonitorDistorcao:
+    """Estado por par e emissão de eventos nos cruzamentos de limiar."""
+
+    def __init__(self, lim_pts: float = 10.0, lim_pct: float = 0.20, max_eventos: int = 200):
+        self.lim_pts    = lim_pts
+        self.lim_pct    = lim_pct
+        self.ref        = None
+        self._paridades: dict[str, float] = {}
+        self._estado:    dict[str, tuple[dict | None, bool]] = {}
+        self._do_snap:  dict[str, float] = {}   # último valor vindo do snapshot, por par
+        self.eventos    = deque(maxlen=max_eventos)
+        self._lock      = threading.Lock()
+
+    # ── entradas ──
+    def atualizar(self, par: str, paridade: float | None) -> EventoDistorcao | None:
+        with self._lock:
+            if self._paridades.get(par) == paridade and par in self._estado:
+                return None
+            self._paridades[par] = paridade
+            ev = self._avaliar(par)
+        if ev:
+            self._publicar([ev])
+        return ev
+
+    def atualizar_ref(self, preco: float | None) -> list[EventoDistorcao]:
+        with self._lock:
+            if preco == self.ref:
+                return []
+            self.ref = preco
+            evs = self._reavaliar_todos()
+        return self._publicar(evs)
+
+    def definir_limiares(self, lim_pts: float, lim_pct: float) -> list[EventoDistorcao]:
+        with self._lock:
+            if (lim_pts, lim_pct) == (self.lim_pts, self.lim_pct):
+                return []
+            self.lim_pts, self.lim_pct = lim_pts, lim_pct
+            evs = self._reavaliar_todos()
+        return self._publicar(evs)
+
+    # ── consulta ──
+    def estado(self) -> dict[str, dict]:
+        """par → distorção corrente com o campo extra `alerta`."""
+        with self._lock:
+            return {par: {**d, "alerta": alerta}
+                    for par, (d, alerta) in self._estado.items() if d is not None}
+
+    # ── internos ──
+    def _avaliar(self, par: str) -> EventoDistorcao | None:
+        d      = calc_distorcao(self.ref, self._paridades.get(par), PARES.get(par, par))
+        alerta = d is not None and em_distorcao(d, self.lim_pts, self.lim_pct)
+        antes  = self._estado.get(par, (None, False))[1]
+        self._estado[par] = (d, alerta)
+        if alerta == antes:
+            return None
+        return EventoDistorcao(par, alerta, d, datetime.now(tz=TZ))
+
+    def _reavaliar_todos(self) -> list[EventoDistorcao]:
+        return [ev for ev in (self._avaliar(p) for p in list(self._paridades)) if ev]
+
+    def _publicar(self, evs: list[EventoDistorcao]) -> list[EventoDistorcao]:
+        for ev in evs:
+            self.eventos.append(ev)
+        return evs
+
+    # ── alimentação a partir das fontes ──
+    def alimentar_snapshot(self, snap) -> list[EventoDistorcao]:
+        """Referência e paridades diárias do snapshot compartilhado.
+
+        Um par só é realimentado quando o valor do snapshot muda, para não
+        sobrescrever uma cotação intraday mais nova com o valor diário.
+        """
+        evs = self.atualizar_ref(snap.wdo_fut)
+        for par, valor in (
+            ("ouro",        snap.paridade_ouro),
+            ("ptax",        snap.ptax_recente_brl),
+            ("preco_justo", em_pontos(snap.preco_justo)),
+            ("cme",         cme_to_brl(snap.cme_d["close"]) if snap.cme_d else None),
+            ("brl_usd",     cme_to_brl(snap.brlusd_d["close"]) if snap.brlusd_d else None),
+        ):
+            if par in self._do_snap and self._do_snap[par] == valor:
+                continue
+            self._do_snap[par] = valor
+            ev = self.atualizar(par, valor)
+            if ev:
+                evs.append(ev)
+        return evs
+
+    def alimentar_intraday(self, ultimo, ouro_brl: float | None) -> list[EventoDistorcao]:
+        """Última barra de cada ticker; `ultimo(ticker)` como intraday.ultimo_intraday."""
+        evs = []
+        cme = ultimo(TICKERS["cme"])
+        brl = ultimo(TICKERS["brl_usd"])
+        gc  = ultimo(TICKERS["xauusd"])
+        for par, valor in (
+            ("cme",     cme_to_brl(cme["close"]) if cme else None),
+            ("brl_usd", cme_to_brl(brl["close"]) if brl else None),
+            ("ouro",    calc_paridade_ouro(gc["close"], ouro_brl) if gc else None),
+        ):
+            if valor is None:
+                continue
+            ev = self.atualizar(par, valor)
+            if ev:
+                evs.append(ev)
+        return evs
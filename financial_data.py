@@ -1,42 +1,25 @@
-import requests
 import pandas as pd
-import yfinance as yf
 import numpy as np
 import streamlit as st
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-from bcb import PTAX
 import os
 
+from wdo_sources import (
+    PLANILHA_LOCAL, buscar_yfinance, buscar_ouro_brl, buscar_variacao_dxy,
+    buscar_planilha_github, buscar_sup_volb3, buscar_ptax, ler_planilha_local, cotacoes_ptax,
+)
+
 # Copie suas funções aqui:
 TICKERS = {
     "cme": "6L=F", "brl_usd": "BRLUSD=X", 
     "xauusd": "GC=F", "dxy": "DX-Y.NYB"
 }
-def baixar_planilha_github(url, caminho_destino):
-    try:
-        resposta = requests.get(url)
-        if resposta.status_code == 200:
-            with open(caminho_destino, 'wb') as f:
-                f.write(resposta.content)
-            return True
-        else:
-            return False
-    except Exception:
-        return False
-
 def safe_execute(func, *args, **kwargs):
     try:
         return func(*args, **kwargs)
     except Exception:
         return None
 
-def extrair_valor(df, ativo, coluna):
-    try:
-        return float(df.loc[df['Asset'] == ativo, coluna].values[0])
-    except:
-        return None
-
 def calcular_vencimento_wdo(data_base):
     mes = data_base.month + 1 if data_base.month < 12 else 1
     ano = data_base.year if data_base.month < 12 else data_base.year + 1
@@ -47,125 +30,43 @@ def calcular_vencimento_wdo(data_base):
     return primeiro_dia
 
 def obter_cotacoes_yfinance(ticker, period="5d"):
-    try:
-        data = yf.Ticker(ticker).history(period=period)
-        if data.empty:
-            return None
-        return {
-            'open': data['Open'].iloc[-1],
-            'high': data['High'].iloc[-1], 
-            'low': data['Low'].iloc[-1],
-            'close': data['Close'].iloc[-1]
-        }
-    except Exception as e:
-        st.error(f"Erro ao obter dados para {ticker}: {e}")
+    # Cache compartilhado com o appdist.py (wdo_sources). Aceita a chave de
+    # TICKERS ("cme") ou o próprio ticker ("6L=F").
+    dados = buscar_yfinance(TICKERS.get(ticker, ticker), period)
+    if not dados:
         return None
+    return {k: dados[k] for k in ("open", "high", "low", "close")}
 
 def obter_valor_grama_ouro_reais():
-    try:
-        response = requests.get("https://www.melhorcambio.com/ouro-hoje", headers={'User-Agent': 'Mozilla/5.0'})
-        soup = BeautifulSoup(response.content, 'html.parser')
-        valor = soup.find('input', {'id': 'comercial'}).get('value')
-        return float(valor.replace(',', '.'))
-    except Exception:
-        return None
+    return buscar_ouro_brl()
 
 def obter_variacao_dxy():
-    cotacoes = obter_cotacoes_yfinance(TICKERS["dxy"])
-    if not cotacoes:
-        return None
-    try:
-        historico = yf.Ticker(TICKERS["dxy"]).history(period="5d")
-        if len(historico) >= 2:
-            anterior = historico['Close'].iloc[-2]
-            atual = historico['Close'].iloc[-1]
-            return round(((atual - anterior) / anterior) * 100, 2)
-    except:
-        return None
+    variacao = buscar_variacao_dxy()
+    return round(variacao, 2) if variacao is not None else None
 
 def carregar_dados_excel():
-    try:
-        # URL do arquivo ddeprofit.xlsx no GitHub
-        url_github = "https://raw.githubusercontent.com/Mvrsant/calculoswdo/main/ddeprofit.xlsx"
-        caminho_local = "ddeprofit.xlsx"
-        # Baixa o arquivo se não existir localmente
-        if not os.path.exists(caminho_local):
-            baixar_planilha_github(url_github, caminho_local)
-        data = pd.read_excel(caminho_local)
-        st.success(f"DADOS CARREGADOS") #"Planilha carregada: {caminho_local}")
-
-        # Valida colunas
-        required_columns = ['Asset', 'Fechamento Anterior', 'Último']
-        if not all(col in data.columns for col in required_columns):
-            st.warning("⚠️ Colunas ausentes no arquivo Excel")
+    # Local primeiro, como antes: o GitHub só é consultado se não houver
+    # ddeprofit.xlsx (que pode estar sendo atualizado à mão ou pelo Profit)
+    if not os.path.exists(PLANILHA_LOCAL):
+        dados = buscar_planilha_github()
+    else:
+        try:
+            dados = ler_planilha_local()
+        except Exception as e:
+            st.error(f"Erro ao carregar Excel: {e}")
             return None
-
-        data['Asset'] = data['Asset'].str.strip()
-        # Extrai dados
-        current_date = datetime.today()
-        expiration_date = calcular_vencimento_wdo(current_date)
-        business_days = len(pd.bdate_range(start=current_date, end=expiration_date))
-
-        return {
-            "wdo_fut": extrair_valor(data, 'WDOFUT', 'Fechamento Anterior'),
-            "dolar_spot": extrair_valor(data, 'USD/BRL', 'Fechamento Anterior'),
-            "di1_fut": extrair_valor(data, 'DI1FUT', 'Último'),
-            "frp0": extrair_valor(data, 'FRP0', 'Último'),
-            "expiration_date": expiration_date.strftime('%d/%m/%Y'),
-            "business_days_remaining": business_days
-        }
-    except Exception as e:
-        st.error(f"Erro ao carregar Excel: {e}")
-        return None
+        if dados is None:
+            st.warning("⚠️ Colunas ausentes no arquivo Excel")
+    if dados is not None:
+        dados = {k: v for k, v in dados.items() if k != "ativos"}
+        st.success("DADOS CARREGADOS")
+    return dados
 
 def extrair_sup_vol_b3():
-    try:
-        # URL do arquivo ddeprofit.xlsx no GitHub
-        url_github = "https://raw.githubusercontent.com/Mvrsant/calculoswdo/main/ddeprofit.xlsx"
-        caminho_local = "ddeprofit.xlsx"
-        # Baixa o arquivo se não existir localmente
-        if not os.path.exists(caminho_local):
-            baixar_planilha_github(url_github, caminho_local)
-        df_b3 = pd.read_excel(caminho_local, sheet_name="base_b3", header=None)
-        return float(df_b3.iloc[18, 6])
-    except Exception as e:
-        st.error(f"Erro ao extrair SUP_VOLB3: {e}")
-        return None
+    return buscar_sup_volb3()
 
 def obter_cotacoes_ptax():
-    try:
-        ptax = PTAX()
-        endpoint = ptax.get_endpoint('CotacaoMoedaPeriodo')
-        data_consulta = datetime.today().date()
-        
-        while True:
-            data_str = data_consulta.strftime('%m.%d.%Y')
-            df = (endpoint.query()
-                  .parameters(moeda='USD', dataInicial=data_str, dataFinalCotacao=data_str)
-                  .collect())
-            if not df.empty:
-                break
-            data_consulta -= timedelta(days=1)
-            
-        df['dataHoraCotacao'] = pd.to_datetime(df['dataHoraCotacao'])
-        df_dia = df[df['dataHoraCotacao'].dt.date == data_consulta]
-        df_dia = df_dia.sort_values(by='dataHoraCotacao').reset_index(drop=True)
-        
-        # Captura data e hora das cotações
-        cotacoes = []
-        for idx, row in df_dia.iterrows():
-            cotacoes.append({
-                'valor': row['cotacaoVenda'],
-                'data': row['dataHoraCotacao'].strftime('%d/%m/%Y'),
-                'hora': row['dataHoraCotacao'].strftime('%H:%M:%S')
-            })
-        # Preenche até 4 cotações
-        while len(cotacoes) < 4:
-            cotacoes.append(None)
-        return cotacoes[:4]
-    except Exception as e:
-        st.error(f"Erro ao obter cotações PTAX: {e}")
-        return [None] * 4
+    return cotacoes_ptax(buscar_ptax())
 
 # ==============================
 # Funções de Cálculo
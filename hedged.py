@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from circuit_breaker import disjuntor
+from source_metrics import metrica, registrar
+
+# ─────────────────────────────────────────────
+# Busca "hedged" — várias fontes, escalonadas, vale a primeira válida
+# ─────────────────────────────────────────────
+# A primeira fonte sai na hora; se não houver resposta válida em `atraso`
+# segundos, sai a próxima, e assim por diante. Uma fonte que falha rápido
+# libera a seguinte na mesma hora. A primeira resposta válida encerra a busca.
+#
+# Cada fonte é uma função (cancelado: threading.Event) -> valor | None. Não dá
+# para interromper um requests.get no meio: as perdedoras são abandonadas (o
+# resultado é descartado e as que nem começaram são canceladas) e o evento
+# `cancelado` avisa as que têm mais de uma etapa para pararem antes da próxima.
+#
+# Latência e desfecho de cada fonte vão para source_metrics como
+# "<rótulo> [<fonte>]"; a ordem de disparo põe na frente as fontes saudáveis e
+# mais rápidas, então a cauda fica limitada pela melhor fonte disponível. Cada
+# fonte tem também um disjuntor com o mesmo nome: aberta, nem é disparada.
+# Perdedora que desistiu porque outra fonte já respondeu (None, sem exceção,
+# depois da vitória) não conta nem como erro nem como sucesso; exceção e
+# desistência por estouro do prazo contam como falha.
+
+ATRASO_PADRAO  = 0.5      # segundos até disparar a próxima fonte
+TIMEOUT_PADRAO = 10.0     # teto da busca inteira
+
+
+def nome_metrica(rotulo: str, fonte: str) -> str:
+    return f"{rotulo} [{fonte}]"
+
+
+def ordenar_por_saude(rotulo: str, nomes: list[str]) -> list[str]:
+    """Saudáveis primeiro, a de menor p50 na frente; depois as ainda não
+    medidas, na ordem dada; por último as que falharam na última vez."""
+    def chave(nome):
+        m = metrica(nome_metrica(rotulo, nome))
+        if m is None or m.ultimo_ok is None:
+            return (1, 0.0)
+        return (0 if m.ultimo_ok else 2, m.percentil(50) or 0.0)
+    return sorted(nomes, key=chave)
+
+
+def _medir(rotulo, nome, func, valida, cancelado, vencida):
+    t0   = time.perf_counter()
+    erro = False
+    try:
+        valor = func(cancelado)
+    except Exception:
+        valor, erro = None, True
+    ok = valida(valor)
+    d  = disjuntor(nome_metrica(rotulo, nome))
+    if valor is None and not erro and vencida.is_set():
+        d.liberar()         # perdeu a corrida: nada a dizer sobre a saúde da fonte
+        return None
+    registrar(nome_metrica(rotulo, nome), time.perf_counter() - t0, False, ok)
+    if ok:
+        d.sucesso()
+    else:
+        d.falha()
+    return valor if ok else None
+
+
+def primeira_resposta(fontes: dict, valida=lambda v: v is not None,
+                      atraso: float = ATRASO_PADRAO, timeout: float = TIMEOUT_PADRAO,
+                      rotulo: str = "hedge") -> tuple[str, object] | None:
+    """(fonte, valor) da primeira resposta válida; None se nenhuma vier no prazo."""
+    pendentes = ordenar_por_saude(rotulo, [n for n in fontes
+                                           if disjuntor(nome_metrica(rotulo, n)).permitir()])
+    if not pendentes:
+        return None
+    cancelado = threading.Event()
+    vencida   = threading.Event()     # outra fonte já respondeu (≠ estouro do prazo)
+    ex        = ThreadPoolExecutor(max_workers=len(pendentes), thread_name_prefix="wdo-hedge")
+    em_voo    = {}
+    limite    = time.monotonic() + timeout
+    try:
+        while pendentes or em_voo:
+            if pendentes:
+                nome = pendentes.pop(0)
+                em_voo[ex.submit(_medir, rotulo, nome, fontes[nome], valida,
+                                 cancelado, vencida)] = nome
+            resta = limite - time.monotonic()
+            if resta <= 0:
+                return None
+            prontos, _ = wait(em_voo, timeout=min(resta, atraso) if pendentes else resta,
+                              return_when=FIRST_COMPLETED)
+            for f in prontos:
+                nome, valor = em_voo.pop(f), f.result()
+                if valor is not None:
+                    vencida.set()
+                    return nome, valor
+        return None
+    finally:
+        for nome in pendentes:          # liberadas pelo disjuntor mas não disparadas
+            disjuntor(nome_metrica(rotulo, nome)).liberar()
+        cancelado.set()
+        ex.shutdown(wait=False, cancel_futures=True)
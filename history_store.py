@@ -0,0 +1,126 @@
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import yfinance as yf
+
+from single_flight import single_flight
+
+# ─────────────────────────────────────────────
+# Histórico local em Parquet (uma partição por ticker)
+# ─────────────────────────────────────────────
+# dados/historico/<ticker>/part-<AAAAMMDDHHMMSS>.parquet
+#
+# Cada sincronização baixa só a partir do último pregão guardado (inclusive,
+# porque a barra do dia corrente é parcial) e grava um arquivo novo na
+# partição. Na leitura as partes são unidas e a data repetida fica com a
+# versão mais nova. Depois de sincronizado, funciona offline.
+
+DIR_HISTORICO    = os.environ.get("WDO_HISTORICO_DIR", os.path.join("dados", "historico"))
+PERIODO_INICIAL  = "2y"
+MAX_PARTES       = 20          # acima disso a partição é compactada num arquivo só
+COLUNAS          = ["Open", "High", "Low", "Close", "Volume"]
+
+_lock = threading.Lock()
+
+
+def _pasta(ticker: str) -> str:
+    return os.path.join(DIR_HISTORICO, re.sub(r"[^A-Za-z0-9._-]", "_", ticker))
+
+def _partes(ticker: str) -> list[str]:
+    pasta = _pasta(ticker)
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(os.path.join(pasta, f) for f in os.listdir(pasta) if f.endswith(".parquet"))
+
+def _gravar_parte(ticker: str, df: pd.DataFrame):
+    os.makedirs(_pasta(ticker), exist_ok=True)
+    carimbo = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
+    destino = os.path.join(_pasta(ticker), f"part-{carimbo}.parquet")
+    tmp     = destino + ".tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+    os.replace(tmp, destino)
+
+# ─────────────────────────────────────────────
+# Leitura
+# ─────────────────────────────────────────────
+def _utc(v) -> pd.Timestamp:
+    t = pd.Timestamp(v)
+    return t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+
+def ler_historico(ticker: str, inicio=None, fim=None, colunas: list[str] | None = None) -> pd.DataFrame:
+    """Barras diárias guardadas de `ticker`, indexadas por data (UTC)."""
+    partes = _partes(ticker)
+    if not partes:
+        return pd.DataFrame(columns=colunas or COLUNAS)
+    cols = None if colunas is None else ["data", *colunas]
+    tabelas = [pq.read_table(p, columns=cols, memory_map=True) for p in partes]
+    df = pa.concat_tables(tabelas).to_pandas()
+    df = df.drop_duplicates("data", keep="last").set_index("data").sort_index()
+    if inicio is not None:
+        df = df[df.index >= _utc(inicio)]
+    if fim is not None:
+        df = df[df.index <= _utc(fim)]
+    return df
+
+def ultima_data(ticker: str) -> pd.Timestamp | None:
+    partes = _partes(ticker)
+    if not partes:
+        return None
+    # o arquivo mais novo sempre contém a última data
+    datas = pq.read_table(partes[-1], columns=["data"], memory_map=True).column("data")
+    return pd.Timestamp(pc.max(datas).as_py()) if len(datas) else None
+
+# ─────────────────────────────────────────────
+# Sincronização incremental
+# ─────────────────────────────────────────────
+def sincronizar(ticker: str) -> int:
+    """Baixa o que falta de `ticker`. Retorna quantas barras foram gravadas."""
+    with _lock:
+        ultima = ultima_data(ticker)
+        t = yf.Ticker(ticker)
+        if ultima is None:
+            hist = t.history(period=PERIODO_INICIAL)
+        else:
+            hist = t.history(start=ultima.strftime("%Y-%m-%d"))
+        if hist is None or hist.empty:
+            return 0
+        hist = hist[[c for c in COLUNAS if c in hist.columns]]
+        hist.index = hist.index.tz_convert("UTC").normalize()
+        df = hist.rename_axis("data").reset_index()
+        if ultima is not None:
+            df = df[df["data"] >= ultima]
+        if df.empty:
+            return 0
+        _gravar_parte(ticker, df)
+        if len(_partes(ticker)) > MAX_PARTES:
+            compactar(ticker)
+        return len(df)
+
+@single_flight(ttl=3600)
+def sincronizar_se_preciso(ticker: str) -> int:
+    """No máximo uma sincronização por ticker por hora; falha de rede vira 0."""
+    try:
+        return sincronizar(ticker)
+    except Exception:
+        return 0
+
+def fechamentos(ticker: str, inicio=None) -> list[float]:
+    """Closes diários do store local, sincronizando antes se a janela venceu."""
+    sincronizar_se_preciso(ticker)
+    return ler_historico(ticker, inicio=inicio, colunas=["Close"])["Close"].dropna().tolist()
+
+def compactar(ticker: str):
+    """Reescreve a partição num único arquivo, sem datas repetidas."""
+    antigas = _partes(ticker)
+    if len(antigas) <= 1:
+        return
+    df = ler_historico(ticker).reset_index()
+    _gravar_parte(ticker, df)
+    for p in antigas:
+        os.remove(p)
@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from ring_buffer import RingBuffer
+from single_flight import single_flight
+from wdo_calc import TZ
+from wdo_sources import TICKERS
+
+# ─────────────────────────────────────────────
+# Ingestão intraday — barras de 1 minuto
+# ─────────────────────────────────────────────
+# buscar_yfinance só guarda a última linha diária. Aqui cada ticker tem uma
+# série de barras de 1 min mantida no processo: a primeira busca traz o dia,
+# as seguintes pedem só a partir da última barra guardada e anexam o que é
+# novo. A última barra do yfinance é parcial (minuto corrente), então ela é
+# substituída quando volta na busca seguinte.
+#
+# As barras ficam em RingBuffer de capacidade fixa: a memória não cresce
+# com o tempo de processo no ar.
+
+INTERVALO     = "1m"
+MAX_BARRAS    = 1500          # ~ um pregão estendido por ticker
+TTL_INTRADAY  = 60            # segundos entre buscas incrementais
+COLUNAS       = ["Open", "High", "Low", "Close"]
+
+_buffers: dict[str, RingBuffer] = {}
+_lock = threading.Lock()
+
+
+def buffer_intraday(ticker: str) -> RingBuffer:
+    """Ring buffer do ticker (criado vazio na primeira consulta)."""
+    with _lock:
+        buf = _buffers.get(ticker)
+        if buf is None:
+            buf = _buffers[ticker] = RingBuffer(MAX_BARRAS)
+        return buf
+
+
+def _baixar_barras(ticker: str, desde: pd.Timestamp | None) -> pd.DataFrame:
+    t = yf.Ticker(ticker)
+    if desde is None:
+        hist = t.history(period="1d", interval=INTERVALO)
+    else:
+        hist = t.history(start=desde.floor("min"), interval=INTERVALO)
+    if hist.empty:
+        return hist
+    hist = hist[COLUNAS]
+    hist.index = hist.index.tz_convert(TZ)   # alinha bolsas de fusos diferentes
+    return hist
+
+
+@single_flight(ttl=TTL_INTRADAY)
+def atualizar_intraday(ticker: str) -> int:
+    """Busca as barras novas de `ticker` e anexa ao buffer. Retorna quantas entraram."""
+    buf    = buffer_intraday(ticker)
+    ult_ts = buf.ultimo_ts
+    desde  = pd.Timestamp(ult_ts, tz="UTC").tz_convert(TZ) if ult_ts is not None else None
+
+    try:
+        novas = _baixar_barras(ticker, desde)
+    except Exception:
+        return 0
+    if novas.empty:
+        return 0
+
+    ts_ns   = novas.index.as_unit("ns").asi8
+    valores = novas.to_numpy(dtype="float64")
+    n = 0
+    with buf.lock:
+        for ts, v in zip(ts_ns, valores):
+            if ult_ts is not None and ts < ult_ts:
+                continue
+            if ts == ult_ts:
+                buf.substituir_ultimo(ts, v)
+            else:
+                buf.append(ts, v)
+                ult_ts = ts
+            n += 1
+    return n
+
+
+def atualizar_todos() -> dict[str, int]:
+    return {t: atualizar_intraday(t) for t in TICKERS.values()}
+
+
+def ultimo_intraday(ticker: str) -> dict | None:
+    buf = buffer_intraday(ticker)
+    with buf.lock:
+        return buf.ultimo()
+
+# ─────────────────────────────────────────────
+# Paridades ao longo do pregão
+# ─────────────────────────────────────────────
+def _serie_derivada(ticker: str, func) -> pd.Series | None:
+    buf = buffer_intraday(ticker)
+    with buf.lock:
+        if len(buf) == 0:
+            return None
+        ts    = buf.janela()[0]
+        close = buf.coluna("close")
+        # func gera um array novo; as views do buffer não saem do lock
+        valores = func(close)
+        idx = pd.DatetimeIndex(ts.astype("datetime64[ns]"), tz="UTC").tz_convert(TZ)
+    return pd.Series(valores, index=idx)
+
+
+def paridades_intraday(wdo_fut: float | None, dxy_prev: float | None) -> pd.DataFrame | None:
+    """CME 6L e USD/BRL em pontos de WDO e abertura via DXY, barra a barra."""
+    colunas = {}
+    cme = _serie_derivada(TICKERS["cme"], lambda c: np.round(1 / c * 1000, 2))
+    if cme is not None:
+        colunas["CME 6L (pts)"] = cme
+    brl = _serie_derivada(TICKERS["brl_usd"], lambda c: np.round(1 / c * 1000, 2))
+    if brl is not None:
+        colunas["USD/BRL (pts)"] = brl
+    if wdo_fut and dxy_prev:
+        dxy = _serie_derivada(TICKERS["dxy"],
+                              lambda c: np.round(wdo_fut * (1 + (c - dxy_prev) / dxy_prev), 4))
+        if dxy is not None:
+            colunas["Abertura DXY"] = dxy
+    if not colunas:
+        return None
+    return pd.concat(colunas, axis=1).sort_index().ffill()
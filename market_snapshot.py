@@ -0,0 +1,459 @@
+import gzip
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from single_flight import single_flight
+from profiling import perfil_corrente, perfilar_em_thread
+from wdo_calc import (
+    TZ, agora_br, fmt, cme_to_brl, inv,
+    calc_abertura_wdo, calc_over, calc_preco_justo, calc_paridade_ouro,
+    calc_bandas, calc_bandas_ptax, calc_distorcao,
+    calc_paridades_ptax, matriz_cruzada, calc_bandas_ptax_moedas, TIPOS_BANDA,
+    vencimentos_wdo, dias_uteis, calc_escada_wdo, calc_base_wdo,
+)
+from wdo_sources import (
+    TICKERS, JANELAS_PTAX, frame_ptax,
+    buscar_yfinance, buscar_variacao_dxy, buscar_ouro_brl,
+    buscar_planilha_github, buscar_sup_volb3, buscar_ptax,
+    buscar_ptax_moedas, moedas_ptax,
+)
+
+# ─────────────────────────────────────────────
+# Snapshot de mercado compartilhado entre sessões
+# ─────────────────────────────────────────────
+# Montado uma vez por janela de atualização e guardado no módulo; todas as
+# sessões recebem a mesma referência. Ninguém deve alterar os dicts ou
+# DataFrames de um snapshot: para mudar algo, monta-se um novo e publica-se.
+
+ENTRADAS    = ["planilha", "sup_volb3", "xauusd_d", "ouro_brl", "dxy_var",
+               "dxy_d", "cme_d", "brlusd_d", "ptax", "ptax_moedas"]   # parâmetros de montar_snapshot
+VENCIMENTOS_ESCADA = 3      # vencimentos do WDO lado a lado (rolagem)
+
+LABELS_PLANILHA = {
+    "wdo_fut":                 "WDO Futuro — Fechamento Anterior",
+    "dolar_spot":              "Dólar Spot — Fechamento Anterior",
+    "di1_fut":                 "DI1 Futuro (taxa a.a.)",
+    "frp0":                    "FRP0 — Último",
+    "expiration_date":         "Vencimento WDO",
+    "business_days_remaining": "Dias Úteis até Vencimento",
+}
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    gerado_em: datetime
+    horario:   str
+
+    # ── Entradas brutas ──
+    planilha:  dict | None
+    sup_volb3: float | None
+    xauusd_d:  dict | None
+    ouro_brl:  float | None
+    dxy_var:   float | None
+    dxy_d:     dict | None
+    cme_d:     dict | None
+    brlusd_d:  dict | None
+    ptax:      pd.DataFrame       # frame_ptax: janelas do dia, em colunas
+    ptax_moedas: pd.DataFrame     # idem, todas as moedas de WDO_PTAX_MOEDAS (coluna moeda)
+
+    # ── Valores derivados ──
+    wdo_fut:          float | None
+    dolar_spot:       float | None
+    di1_fut:          float | None
+    frp0:             float | None
+    du:               int | None
+    venc_str:         str
+    xauusd:           float | None
+    wdo_abertura:     float | None
+    over:             float | None
+    preco_justo:      float | None
+    paridade_ouro:    float | None
+    bandas:           dict | None
+    bandas_ptax:      dict | None
+    escada:           pd.DataFrame | None   # um vencimento por linha (calc_escada_wdo)
+    base_termo:       pd.DataFrame | None   # base e pontos a termo por vencimento (calc_base_wdo)
+    paridades_ptax:   pd.DataFrame | None   # última PTAX e cruzada vs USD por moeda
+    cruzadas_ptax:    pd.DataFrame | None   # matriz moeda × moeda
+    bandas_ptax_moedas: dict | None         # bandas de todas as janelas de todas as moedas
+    ptax_recente:     dict | None
+    ptax_recente_brl: float | None
+    ptax_recente_num: int | None
+    dist_ouro:        dict | None
+    dist_ptax:        dict | None
+    delta_cme:        float | None
+    delta_usd:        float | None
+
+    # ── Tabelas prontas para exibição ──
+    df_planilha:    pd.DataFrame | None
+    df_bandas:      pd.DataFrame | None
+    df_bandas_ptax: pd.DataFrame | None
+    df_cme:         pd.DataFrame | None
+    df_brl:         pd.DataFrame | None
+
+    # Carregado do último snapshot salvo, à espera do primeiro refresh do processo
+    do_disco: bool = False
+
+    @property
+    def ptax_ok(self) -> bool:
+        return not self.ptax.empty
+
+    @property
+    def completo(self) -> bool:
+        """Todas as fontes responderam."""
+        return self.ptax_ok and all(getattr(self, c) is not None
+                                    for c in ENTRADAS if c not in ("ptax", "ptax_moedas"))
+
+    @property
+    def fontes_ok(self) -> int:
+        """Quantas entradas vieram preenchidas (compara snapshots incompletos)."""
+        return sum(not getattr(self, c).empty if c in ("ptax", "ptax_moedas")
+                   else getattr(self, c) is not None for c in ENTRADAS)
+
+
+# ─────────────────────────────────────────────
+# Montagem das tabelas
+# ─────────────────────────────────────────────
+def _tabela_planilha(planilha):
+    if not planilha:
+        return None
+    rows = [{"Descrição": LABELS_PLANILHA.get(k, k), "Valor": str(v)}
+            for k, v in planilha.items() if k != "ativos"]
+    return pd.DataFrame(rows)
+
+def tabela_bandas(bandas, wdo_abertura):
+    if not bandas:
+        return None
+    return pd.DataFrame({
+        "Tipo":        TIPOS_BANDA,
+        "Valor (pts)": [bandas[t] for t in TIPOS_BANDA],
+        "Distância":   [round(bandas[t] - wdo_abertura, 2) for t in TIPOS_BANDA],
+    })
+
+def _tabela_bandas_ptax(bandas_ptax, ptax):
+    if not bandas_ptax or not len(bandas_ptax["bandas"]):
+        return None
+    df = pd.DataFrame(bandas_ptax["bandas"].T,
+                      columns=[f"PTAX {i+1} ({h})" for i, h in enumerate(ptax["hora"])])
+    df.insert(0, "Tipo", TIPOS_BANDA)
+    return df
+
+def _tabela_cme(cme_d):
+    if not cme_d:
+        return None, None
+    cme_open_brl  = cme_to_brl(cme_d["open"])
+    cme_high_brl  = cme_to_brl(cme_d["low"])
+    cme_low_brl   = cme_to_brl(cme_d["high"])
+    cme_close_brl = cme_to_brl(cme_d["close"])
+    cme_prev_brl  = cme_to_brl(cme_d["prev"])
+    delta_cme     = round(cme_close_brl - cme_prev_brl, 2) if cme_close_brl and cme_prev_brl else None
+
+    df_cme = pd.DataFrame({
+        "Campo":        ["Abertura", "Máxima", "Mínima", "Fechamento", "Fech. Anterior"],
+        "USD":          [fmt(cme_d["open"],6), fmt(cme_d["high"],6),
+                         fmt(cme_d["low"],6),  fmt(cme_d["close"],6), fmt(cme_d["prev"],6)],
+        "BRL pts":      [fmt(cme_open_brl,2), fmt(cme_high_brl,2),
+                         fmt(cme_low_brl,2),   fmt(cme_close_brl,2), fmt(cme_prev_brl,2)],
+    })
+    return df_cme, delta_cme
+
+def _tabela_brl(brlusd_d):
+    if not brlusd_d:
+        return None, None
+    usd_open  = inv(brlusd_d["open"])
+    usd_high  = inv(brlusd_d["low"])
+    usd_low   = inv(brlusd_d["high"])
+    usd_close = inv(brlusd_d["close"])
+    usd_prev  = inv(brlusd_d["prev"])
+    delta_usd = round(usd_close - usd_prev, 4) if usd_close and usd_prev else None
+
+    df_brl = pd.DataFrame({
+        "Campo":   ["Abertura", "Máxima", "Mínima", "Fechamento", "Fech. Anterior"],
+        "BRLUSD":  [fmt(brlusd_d["open"],6), fmt(brlusd_d["high"],6),
+                    fmt(brlusd_d["low"],6),   fmt(brlusd_d["close"],6), fmt(brlusd_d["prev"],6)],
+        "USD/BRL": [fmt(usd_open,4), fmt(usd_high,4),
+                    fmt(usd_low,4),  fmt(usd_close,4), fmt(usd_prev,4)],
+    })
+    return df_brl, delta_usd
+
+# ─────────────────────────────────────────────
+# Construção do snapshot
+# ─────────────────────────────────────────────
+def montar_snapshot(planilha, sup_volb3, xauusd_d, ouro_brl, dxy_var,
+                    dxy_d, cme_d, brlusd_d, ptax, ptax_moedas=None) -> MarketSnapshot:
+    """Deriva todos os valores e tabelas a partir das entradas brutas."""
+    ptax        = frame_ptax(None) if ptax is None else ptax.head(JANELAS_PTAX)
+    ptax_moedas = frame_ptax(None) if ptax_moedas is None else ptax_moedas
+
+    wdo_fut    = planilha.get("wdo_fut")    if planilha else None
+    dolar_spot = planilha.get("dolar_spot") if planilha else None
+    di1_fut    = planilha.get("di1_fut")    if planilha else None
+    frp0       = planilha.get("frp0")       if planilha else None
+    du         = planilha.get("business_days_remaining") if planilha else None
+    venc_str   = planilha.get("expiration_date") if planilha else "—"
+    xauusd     = xauusd_d["close"] if xauusd_d else None
+
+    wdo_abertura  = calc_abertura_wdo(wdo_fut, dxy_var)
+    over          = calc_over(di1_fut, du)
+    preco_justo   = calc_preco_justo(dolar_spot, over)
+    paridade_ouro = calc_paridade_ouro(xauusd, ouro_brl)
+    bandas        = calc_bandas(wdo_abertura, over, sup_volb3)
+    bandas_ptax   = calc_bandas_ptax(wdo_abertura, over, sup_volb3, ptax)
+
+    hoje   = datetime.today()
+    vencs  = vencimentos_wdo(hoje, VENCIMENTOS_ESCADA)
+    escada = calc_escada_wdo(vencs, dias_uteis(hoje, vencs), wdo_abertura,
+                             dolar_spot, di1_fut, sup_volb3)
+    base_termo = calc_base_wdo(escada, dolar_spot, wdo_fut, frp0)
+
+    paridades_ptax     = calc_paridades_ptax(ptax_moedas)
+    bandas_ptax_moedas = calc_bandas_ptax_moedas(wdo_abertura, over, sup_volb3,
+                                                 ptax_moedas, paridades_ptax)
+
+    ptax_recente_num = len(ptax) or None
+    ptax_recente     = ptax.iloc[-1][["valor", "data", "hora"]].to_dict() if ptax_recente_num else None
+    ptax_recente_brl = round(ptax_recente["valor"] * 1000, 2) if ptax_recente else None
+
+    df_cme, delta_cme = _tabela_cme(cme_d)
+    df_brl, delta_usd = _tabela_brl(brlusd_d)
+
+    return MarketSnapshot(
+        gerado_em=datetime.now(tz=TZ),
+        horario=agora_br(),
+        planilha=planilha, sup_volb3=sup_volb3, xauusd_d=xauusd_d, ouro_brl=ouro_brl,
+        dxy_var=dxy_var, dxy_d=dxy_d, cme_d=cme_d, brlusd_d=brlusd_d, ptax=ptax,
+        ptax_moedas=ptax_moedas,
+        wdo_fut=wdo_fut, dolar_spot=dolar_spot, di1_fut=di1_fut, frp0=frp0, du=du, venc_str=venc_str,
+        xauusd=xauusd, wdo_abertura=wdo_abertura, over=over, preco_justo=preco_justo,
+        paridade_ouro=paridade_ouro, bandas=bandas, bandas_ptax=bandas_ptax,
+        escada=escada, base_termo=base_termo, paridades_ptax=paridades_ptax,
+        cruzadas_ptax=matriz_cruzada(paridades_ptax), bandas_ptax_moedas=bandas_ptax_moedas,
+        ptax_recente=ptax_recente,
+        ptax_recente_brl=ptax_recente_brl, ptax_recente_num=ptax_recente_num,
+        dist_ouro=calc_distorcao(wdo_fut, paridade_ouro, "WDO vs Paridade Ouro"),
+        dist_ptax=calc_distorcao(wdo_fut, ptax_recente_brl, "WDO vs PTAX mais recente"),
+        delta_cme=delta_cme, delta_usd=delta_usd,
+        df_planilha=_tabela_planilha(planilha),
+        df_bandas=tabela_bandas(bandas, wdo_abertura),
+        df_bandas_ptax=_tabela_bandas_ptax(bandas_ptax, ptax),
+        df_cme=df_cme, df_brl=df_brl,
+    )
+
+_atual: MarketSnapshot | None = None
+_lock  = threading.Lock()
+
+# Planilha lida localmente (DDE do Profit, ver dde_watch.py); quando presente,
+# substitui o download do GitHub como fonte da planilha.
+_planilha_local: tuple[dict | None, float | None] | None = None
+
+# Observador da montagem em andamento, por thread: obter_snapshot(ao_chegar=…)
+# registra aqui e construir_snapshot chama na mesma thread a cada fonte que chega.
+_local = threading.local()
+
+ROTULOS_FONTES = {
+    "planilha": "Planilha B3",
+    "xauusd_d": "Ouro USD",
+    "ouro_brl": "Ouro BRL",
+    "dxy_var":  "DXY",
+    "dxy_d":    "DXY",
+    "cme_d":    "CME 6L",
+    "brlusd_d": "BRLUSD",
+    "ptax":     "PTAX",
+    "ptax_moedas": "PTAX moedas",
+}
+
+def _buscar_planilha() -> tuple[dict | None, float | None]:
+    if _planilha_local is not None:
+        return _planilha_local
+    return buscar_planilha_github(), buscar_sup_volb3()
+
+def _buscas() -> dict:
+    """Entrada de montar_snapshot → função que a busca (a planilha traz o SUP_VOLB3 junto)."""
+    return {
+        "planilha": _buscar_planilha,
+        "xauusd_d": lambda: buscar_yfinance(TICKERS["xauusd"]),
+        "ouro_brl": buscar_ouro_brl,
+        "dxy_var":  buscar_variacao_dxy,
+        "dxy_d":    lambda: buscar_yfinance(TICKERS["dxy"]),
+        "cme_d":    lambda: buscar_yfinance(TICKERS["cme"]),
+        "brlusd_d": lambda: buscar_yfinance(TICKERS["brl_usd"]),
+        "ptax":     buscar_ptax,
+        "ptax_moedas": lambda: buscar_ptax_moedas(moedas_ptax()),
+    }
+
+def _montar(entradas: dict) -> MarketSnapshot:
+    planilha, sup_volb3 = entradas.get("planilha") or (None, None)
+    return montar_snapshot(planilha=planilha, sup_volb3=sup_volb3,
+                           **{k: entradas.get(k) for k in ROTULOS_FONTES if k != "planilha"})
+
+def _herdar_contexto(ctx):
+    # Sem o contexto do script os st.warning dos fetchers se perdem
+    if ctx is not None:
+        add_script_run_ctx(threading.current_thread(), ctx)
+
+def construir_snapshot() -> MarketSnapshot:
+    """Busca todas as fontes em paralelo e monta um snapshot novo.
+
+    Se a thread registrou um observador (obter_snapshot(ao_chegar=…)), ele
+    recebe um snapshot parcial e a lista de fontes pendentes a cada fonte que
+    chega, a partir da planilha. Se o observador for interrompido (rerun do
+    Streamlit), a montagem segue até o fim e a interrupção é repassada depois.
+    """
+    ao_chegar = getattr(_local, "ao_chegar", None)
+    prof      = perfil_corrente()       # rerun perfilado: cada busca perfila a própria thread
+    buscas    = _buscas()
+    entradas  = {}
+    with ThreadPoolExecutor(max_workers=len(buscas), thread_name_prefix="wdo-fonte",
+                            initializer=_herdar_contexto, initargs=(get_script_run_ctx(),)) as ex:
+        futuros = {ex.submit(perfilar_em_thread(prof, f)): nome for nome, f in buscas.items()}
+        for fut in as_completed(futuros):
+            entradas[futuros[fut]] = fut.result()
+            pendentes = [n for n in buscas if n not in entradas]
+            if ao_chegar is None or "planilha" not in entradas or not pendentes:
+                continue
+            try:
+                ao_chegar(_montar(entradas), pendentes)
+            except BaseException as exc:
+                _local.interrupcao, ao_chegar = exc, None
+    return _montar(entradas)
+
+def _publicar_sem_lock(snap: MarketSnapshot) -> MarketSnapshot:
+    global _atual
+    _atual = snap
+    return snap
+
+def _publicar(snap: MarketSnapshot) -> MarketSnapshot:
+    with _lock:
+        return _publicar_sem_lock(snap)
+
+@single_flight(ttl=300)
+def _recarregar() -> MarketSnapshot:
+    snap = construir_snapshot()
+    with _lock:
+        # Montagem ao vivo com menos fontes que a cópia do disco não a substitui:
+        # a cópia segue publicada (do_disco) e a próxima rodada tenta de novo.
+        if _atual is None or not _atual.do_disco or snap.fontes_ok >= _atual.fontes_ok:
+            _publicar_sem_lock(snap)
+    if snap.completo:
+        try:
+            salvar_snapshot(snap)
+        except Exception:
+            pass        # sem disco o app segue funcionando, só perde a partida rápida
+    return snap
+
+# ─────────────────────────────────────────────
+# Último snapshot completo em disco (partida a frio)
+# ─────────────────────────────────────────────
+# Cada montagem completa é gravada num pickle comprimido (entradas e
+# derivados). Na primeira chamada do processo esse arquivo é servido na hora,
+# com do_disco=True, enquanto uma thread monta o snapshot ao vivo. Se os campos
+# do MarketSnapshot mudaram desde a gravação, os derivados são recalculados a
+# partir das entradas salvas; arquivo ilegível é ignorado.
+
+ARQUIVO_SNAPSHOT = os.environ.get("WDO_SNAPSHOT_ARQUIVO", os.path.join("dados", "snapshot.pkl.gz"))
+VERSAO_ARQUIVO   = 2          # 2: bandas_ptax guarda o array de bandas, não o frame
+
+def salvar_snapshot(snap: MarketSnapshot, caminho: str | None = None):
+    caminho = caminho or ARQUIVO_SNAPSHOT
+    pasta   = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    tmp = caminho + ".tmp"
+    with gzip.open(tmp, "wb", compresslevel=6) as f:
+        pickle.dump({"versao": VERSAO_ARQUIVO, "snapshot": replace(snap, do_disco=False)},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, caminho)
+
+def carregar_snapshot(caminho: str | None = None) -> MarketSnapshot | None:
+    try:
+        with gzip.open(caminho or ARQUIVO_SNAPSHOT, "rb") as f:
+            dados = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(dados, dict) or dados.get("versao") != VERSAO_ARQUIVO:
+        return None
+    salvo = vars(dados["snapshot"])
+    if set(salvo) != {f.name for f in fields(MarketSnapshot)}:
+        snap = montar_snapshot(**{c: salvo.get(c) for c in ENTRADAS})
+        return replace(snap, gerado_em=salvo["gerado_em"], horario=salvo["horario"], do_disco=True)
+    return replace(dados["snapshot"], do_disco=True)
+
+_disco_verificado = False
+_fundo: threading.Thread | None = None
+
+def _partida_do_disco():
+    global _disco_verificado
+    with _lock:
+        if _disco_verificado:
+            return
+        _disco_verificado = True
+    snap = carregar_snapshot()
+    with _lock:
+        if snap is not None and _atual is None:
+            _publicar_sem_lock(snap)
+
+def _recarregar_em_fundo():
+    global _fundo
+    def alvo():
+        try:
+            _recarregar()
+        except Exception:
+            pass
+    with _lock:
+        if _fundo is not None and _fundo.is_alive():
+            return
+        _fundo = threading.Thread(target=alvo, name="wdo-snapshot-fundo", daemon=True)
+        _fundo.start()
+
+def obter_snapshot(ao_chegar=None) -> MarketSnapshot:
+    """Snapshot corrente, compartilhado (somente leitura) por todas as sessões.
+
+    `ao_chegar(parcial, pendentes)` só é chamado quando esta chamada é a que
+    monta o snapshot (ver construir_snapshot). Na partida do processo serve o
+    último snapshot salvo em disco e monta o novo em segundo plano.
+    """
+    if _atual is None:
+        _partida_do_disco()
+    atual = _atual
+    if atual is not None and atual.do_disco:
+        _recarregar_em_fundo()
+        return atual
+
+    _local.ao_chegar, _local.interrupcao = ao_chegar, None
+    try:
+        snap = _recarregar()
+    finally:
+        _local.ao_chegar = None
+    if _local.interrupcao is not None:
+        exc, _local.interrupcao = _local.interrupcao, None
+        raise exc
+    return _atual or snap
+
+def snapshot_atual() -> MarketSnapshot | None:
+    """Último snapshot montado, sem disparar busca (None se ainda não houve)."""
+    return _atual
+
+def definir_planilha_local(planilha: dict | None, sup_volb3: float | None) -> MarketSnapshot | None:
+    """Troca a planilha do snapshot corrente sem rebuscar as demais fontes.
+
+    Sobre a cópia do disco, o resultado continua marcado como do disco e com o
+    horário dela: as outras fontes ainda são as salvas e o refresh segue devido.
+    """
+    global _planilha_local
+    _planilha_local = (planilha, sup_volb3)
+    base = _atual
+    if base is None:
+        return None
+    snap = montar_snapshot(
+        planilha, sup_volb3, base.xauusd_d, base.ouro_brl, base.dxy_var,
+        base.dxy_d, base.cme_d, base.brlusd_d, base.ptax, base.ptax_moedas,
+    )
+    if base.do_disco:
+        snap = replace(snap, gerado_em=base.gerado_em, horario=base.horario, do_disco=True)
+    return _publicar(snap)
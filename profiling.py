@@ -0,0 +1,174 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+import pandas as pd
+import streamlit as st
+
+# ─────────────────────────────────────────────
+# Perfil de um rerun (opt-in)
+# ─────────────────────────────────────────────
+# Desligado por padrão. Liga de dois jeitos:
+#   ?perfil=1 na URL      → perfila um único rerun e remove o parâmetro
+#   WDO_PERFIL=1 no env   → perfila todo rerun (para desenvolvimento)
+#
+# Com o perfil desligado o custo é ler uma variável de ambiente e um parâmetro
+# da URL; o cProfile só é criado quando um dos dois está presente.
+#
+# O resultado aparece no fim da página: tabela por função e downloads do
+# .prof (pstats/snakeviz) e das pilhas colapsadas (flamegraph.pl, speedscope).
+#
+# O cProfile só enxerga a thread que o ligou. Código que espalha trabalho por
+# threads durante o rerun (ex. construir_snapshot) embrulha cada tarefa com
+# perfilar_em_thread(perfil_corrente(), func): cada thread ganha um cProfile
+# próprio, somado ao do rerun no encerramento.
+
+PARAM   = "perfil"
+CHAVE   = "_perfil_rerun"
+TOP_N   = 40
+
+_local = threading.local()
+_lock  = threading.Lock()
+
+
+def perfil_pedido() -> bool:
+    return os.environ.get("WDO_PERFIL") == "1" or st.query_params.get(PARAM) == "1"
+
+
+def iniciar_perfil() -> cProfile.Profile | None:
+    """Começa a perfilar o rerun atual se pedido; None quando desligado."""
+    antigo, _local.prof = getattr(_local, "prof", None), None
+    if antigo is not None:
+        antigo.disable()         # rerun anterior interrompido antes do encerrar_perfil
+    if not perfil_pedido():
+        return None
+    if PARAM in st.query_params:
+        del st.query_params[PARAM]      # um rerun só
+    prof = cProfile.Profile()
+    prof.t0 = time.perf_counter()
+    prof.threads = []            # perfis das threads auxiliares (perfilar_em_thread)
+    _local.prof = prof
+    prof.enable()
+    return prof
+
+
+def perfil_corrente() -> cProfile.Profile | None:
+    """Perfil ligado nesta thread (None fora de um rerun perfilado)."""
+    return getattr(_local, "prof", None)
+
+
+def perfilar_em_thread(prof: cProfile.Profile | None, func):
+    """`func` para rodar noutra thread com um cProfile próprio, somado a `prof`.
+    Sem perfil devolve `func` como está."""
+    if prof is None:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        p = cProfile.Profile()
+        try:
+            p.enable()
+        except ValueError:
+            # Python ≥ 3.12: um profiler por interpretador, e o do rerun já
+            # recebe os eventos de todas as threads
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            p.disable()
+            with _lock:
+                prof.threads.append(p)
+
+    return wrapper
+
+# ─────────────────────────────────────────────
+# Formatos de saída
+# ─────────────────────────────────────────────
+def _nome(func: tuple) -> str:
+    arquivo, linha, nome = func
+    if arquivo == "~":
+        return nome                      # built-in, ex. <method 'read' of ...>
+    return f"{os.path.basename(arquivo)}:{linha}({nome})"
+
+
+def tabela_perfil(stats: pstats.Stats, n: int = TOP_N) -> pd.DataFrame:
+    """Funções ordenadas por tempo acumulado."""
+    linhas = [{
+        "Função":         _nome(func),
+        "Chamadas":       nc,
+        "Próprio (ms)":   round(tt * 1000, 2),
+        "Acumulado (ms)": round(ct * 1000, 2),
+    } for func, (cc, nc, tt, ct, _) in stats.stats.items()]
+    df = pd.DataFrame(linhas)
+    if df.empty:
+        return df
+    return df.sort_values("Acumulado (ms)", ascending=False).head(n).reset_index(drop=True)
+
+
+def pilhas_colapsadas(stats: pstats.Stats) -> str:
+    """Formato "a;b;c <µs>" para flamegraph.pl / speedscope.
+
+    O cProfile guarda só pares chamador→chamado, não pilhas inteiras; cada
+    função é pendurada no chamador que mais tempo gastou nela. É uma
+    aproximação, mas preserva o tempo próprio de cada função.
+    """
+    principal = {}
+    for func, (_, _, _, _, chamadores) in stats.stats.items():
+        if chamadores:
+            principal[func] = max(chamadores.items(), key=lambda kv: kv[1][3])[0]
+
+    def pilha(func):
+        visto, cadeia = set(), []
+        while func is not None and func not in visto:
+            visto.add(func)
+            cadeia.append(_nome(func))
+            func = principal.get(func)
+        return ";".join(reversed(cadeia))
+
+    total = defaultdict(int)
+    for func, (_, _, tt, _, _) in stats.stats.items():
+        us = int(tt * 1e6)
+        if us > 0:
+            total[pilha(func)] += us
+    return "\n".join(f"{p} {us}" for p, us in sorted(total.items())) + "\n"
+
+
+def encerrar_perfil(prof: cProfile.Profile | None):
+    """Para o perfil e mostra o resultado no fim da página.
+
+    O resultado fica em st.session_state até ser descartado: os botões de
+    download provocam um rerun, que já não é perfilado.
+    """
+    if prof is not None:
+        prof.disable()
+        _local.prof = None
+        duracao = time.perf_counter() - prof.t0
+        with _lock:
+            threads = list(prof.threads)
+        stats = pstats.Stats(prof, *threads, stream=io.StringIO())
+        st.session_state[CHAVE] = {
+            "duracao": duracao,
+            "tabela":  tabela_perfil(stats),
+            "prof":    marshal.dumps(stats.stats),
+            "folded":  pilhas_colapsadas(stats),
+        }
+
+    res = st.session_state.get(CHAVE)
+    if res is None:
+        return
+    with st.expander(f"⏱️ Perfil do rerun — {res['duracao'] * 1000:.0f} ms", expanded=True):
+        st.dataframe(res["tabela"], hide_index=True, use_container_width=True)
+        c1, c2, c3 = st.columns(3)
+        c1.download_button("⬇️ wdo.prof (pstats / snakeviz)", res["prof"],
+                           file_name="wdo.prof", mime="application/octet-stream")
+        c2.download_button("⬇️ wdo.folded (flame graph)", res["folded"],
+                           file_name="wdo.folded", mime="text/plain")
+        if c3.button("✖️ Descartar perfil"):
+            del st.session_state[CHAVE]
+            st.rerun()
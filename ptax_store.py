@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from bcb import PTAX as BCB_PTAX
+
+# ─────────────────────────────────────────────
+# Histórico local de PTAX (SQLite)
+# ─────────────────────────────────────────────
+# Guarda todas as janelas intradiárias da PTAX (abertura, 10h, 11h, 12h,
+# fechamento) indexadas por moeda e data. A sincronização pede ao BCB só o
+# intervalo entre o último dia guardado (inclusive, pois o dia corrente ainda
+# recebe janelas) e hoje, em lotes de datas.
+
+DB_PTAX       = os.environ.get("WDO_PTAX_DB", os.path.join("dados", "ptax.sqlite3"))
+DIAS_INICIAIS = 30
+LOTE_DIAS     = 90
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ptax (
+    moeda           TEXT NOT NULL,
+    data_hora       TEXT NOT NULL,      -- ISO 8601, horário de Brasília
+    data            TEXT NOT NULL,      -- AAAA-MM-DD
+    cotacao_compra  REAL,
+    cotacao_venda   REAL,
+    tipo_boletim    TEXT,
+    PRIMARY KEY (moeda, data_hora)
+);
+CREATE INDEX IF NOT EXISTS ix_ptax_moeda_data ON ptax (moeda, data);
+"""
+
+_local = threading.local()
+_escrita = threading.Lock()
+
+
+def _conexao() -> sqlite3.Connection:
+    con = getattr(_local, "con", None)
+    if con is None:
+        pasta = os.path.dirname(DB_PTAX)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        con = sqlite3.connect(DB_PTAX)
+        con.executescript(_SCHEMA)
+        _local.con = con
+    return con
+
+# ─────────────────────────────────────────────
+# Sincronização
+# ─────────────────────────────────────────────
+def ultimo_dia(moeda: str = "USD") -> date | None:
+    row = _conexao().execute("SELECT MAX(data) FROM ptax WHERE moeda = ?", (moeda,)).fetchone()
+    return date.fromisoformat(row[0]) if row and row[0] else None
+
+def _baixar(moeda: str, inicio: date, fim: date) -> pd.DataFrame:
+    endpoint = BCB_PTAX().get_endpoint("CotacaoMoedaPeriodo")
+    return (endpoint.query()
+            .parameters(moeda=moeda,
+                        dataInicial=inicio.strftime("%m.%d.%Y"),
+                        dataFinalCotacao=fim.strftime("%m.%d.%Y"))
+            .collect())
+
+def _linhas(moeda: str, df: pd.DataFrame | None) -> list[tuple]:
+    if df is None or df.empty:
+        return []
+    dh = pd.to_datetime(df["dataHoraCotacao"])
+    return list(zip(
+        [moeda] * len(df),
+        dh.dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        dh.dt.strftime("%Y-%m-%d"),
+        df["cotacaoCompra"].astype(float),
+        df["cotacaoVenda"].astype(float),
+        df["tipoBoletim"] if "tipoBoletim" in df.columns else [None] * len(df),
+    ))
+
+def _inserir(linhas: list[tuple]) -> int:
+    if not linhas:
+        return 0
+    con = _conexao()
+    with _escrita, con:
+        con.executemany("INSERT OR REPLACE INTO ptax VALUES (?, ?, ?, ?, ?, ?)", linhas)
+    return len(linhas)
+
+def gravar(moeda: str, df: pd.DataFrame) -> int:
+    return _inserir(_linhas(moeda, df))
+
+def _pendente(moeda: str, hoje: date) -> list[tuple]:
+    """Linhas do BCB desde o último dia guardado da moeda, em lotes de datas."""
+    inicio = ultimo_dia(moeda) or hoje - timedelta(days=DIAS_INICIAIS)
+    linhas = []
+    while inicio <= hoje:
+        fim     = min(inicio + timedelta(days=LOTE_DIAS - 1), hoje)
+        linhas += _linhas(moeda, _baixar(moeda, inicio, fim))
+        inicio  = fim + timedelta(days=1)
+    return linhas
+
+def sincronizar_moedas(moedas: list[str], hoje: date | None = None) -> tuple[int, dict]:
+    """Sincroniza várias moedas de uma vez.
+
+    O BCB responde uma moeda por consulta: os downloads correm em paralelo e
+    tudo é gravado numa transação só. Moeda que falhar não impede as demais.
+    Retorna (linhas gravadas, {moeda: exceção} das que falharam).
+    """
+    hoje = hoje or datetime.today().date()
+
+    def baixar(moeda):
+        try:
+            return _pendente(moeda, hoje), None
+        except Exception as e:
+            return [], e
+
+    with ThreadPoolExecutor(max_workers=max(len(moedas), 1), thread_name_prefix="wdo-ptax") as ex:
+        resultados = list(ex.map(baixar, moedas))
+    total = _inserir([l for linhas, _ in resultados for l in linhas])
+    return total, {m: e for m, (_, e) in zip(moedas, resultados) if e is not None}
+
+# ─────────────────────────────────────────────
+# Consultas (índice moeda + data)
+# ─────────────────────────────────────────────
+_COLS = ["data_hora", "cotacao_compra", "cotacao_venda", "tipo_boletim"]
+
+def ptax_periodo(inicio: date, fim: date, moeda: str = "USD") -> pd.DataFrame:
+    cur = _conexao().execute(
+        "SELECT data_hora, cotacao_compra, cotacao_venda, tipo_boletim FROM ptax "
+        "WHERE moeda = ? AND data BETWEEN ? AND ? ORDER BY data_hora",
+        (moeda, inicio.isoformat(), fim.isoformat()),
+    )
+    df = pd.DataFrame(cur.fetchall(), columns=_COLS)
+    df["data_hora"] = pd.to_datetime(df["data_hora"])
+    return df
+
+def ptax_do_dia(dia: date, moeda: str = "USD") -> pd.DataFrame:
+    return ptax_periodo(dia, dia, moeda)
+
+def ptax_ultimo_dia_moedas(moedas: list[str], ate: date | None = None) -> pd.DataFrame:
+    """Janelas do dia mais recente de cada moeda numa consulta só, com a coluna moeda."""
+    ate = ate or datetime.today().date()
+    marcas = ",".join("?" * len(moedas))
+    cur = _conexao().execute(
+        "SELECT p.moeda, p.data_hora, p.cotacao_compra, p.cotacao_venda, p.tipo_boletim "
+        "FROM ptax p JOIN (SELECT moeda, MAX(data) AS dia FROM ptax "
+        f"                 WHERE moeda IN ({marcas}) AND data <= ? GROUP BY moeda) u "
+        "ON p.moeda = u.moeda AND p.data = u.dia ORDER BY p.moeda, p.data_hora",
+        (*moedas, ate.isoformat()),
+    )
+    df = pd.DataFrame(cur.fetchall(), columns=["moeda", *_COLS])
+    df["data_hora"] = pd.to_datetime(df["data_hora"])
+    return df
+
+def ptax_ultimo_dia(moeda: str = "USD", ate: date | None = None) -> pd.DataFrame:
+    """Janelas do dia mais recente com PTAX (até `ate`, inclusive)."""
+    ate = ate or datetime.today().date()
+    row = _conexao().execute(
+        "SELECT MAX(data) FROM ptax WHERE moeda = ? AND data <= ?", (moeda, ate.isoformat()),
+    ).fetchone()
+    if not row or not row[0]:
+        return pd.DataFrame(columns=_COLS)
+    return ptax_do_dia(date.fromisoformat(row[0]), moeda)
@@ -0,0 +1,89 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+# Ring buffer de cotações com memória fixa
+# ─────────────────────────────────────────────
+# Cada instrumento tem capacidade fixa, alocada uma vez. Cada amostra é gravada
+# em duas posições (i e i + capacidade), de modo que as últimas n amostras são
+# sempre uma fatia contígua: janelas saem como views numpy, sem cópia.
+# As views são somente leitura e valem até a próxima escrita que as recubra.
+
+CAMPOS_OHLC = ("open", "high", "low", "close")
+
+
+class RingBuffer:
+    """Série temporal (timestamp + campos float) com append O(1)."""
+
+    def __init__(self, capacidade: int, campos: tuple = CAMPOS_OHLC):
+        if capacidade <= 0:
+            raise ValueError("capacidade deve ser positiva")
+        self.capacidade = capacidade
+        self.campos     = tuple(campos)
+        self._idx       = {c: i for i, c in enumerate(self.campos)}
+        self._ts        = np.zeros(2 * capacidade, dtype="int64")      # ns desde epoch (UTC)
+        self._val       = np.full((2 * capacidade, len(self.campos)), np.nan)
+        self._pos       = 0      # próxima posição de escrita, em [0, capacidade)
+        self._n         = 0
+        self.lock       = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def ultimo_ts(self) -> int | None:
+        if self._n == 0:
+            return None
+        return int(self._ts[self._pos - 1 + self.capacidade])
+
+    def _gravar(self, pos: int, ts: int, valores):
+        self._ts[pos] = self._ts[pos + self.capacidade] = ts
+        self._val[pos] = self._val[pos + self.capacidade] = valores
+
+    def append(self, ts: int, valores):
+        """Acrescenta uma amostra; sobrescreve a mais antiga quando cheio."""
+        self._gravar(self._pos, ts, valores)
+        self._pos = (self._pos + 1) % self.capacidade
+        self._n   = min(self._n + 1, self.capacidade)
+
+    def substituir_ultimo(self, ts: int, valores):
+        """Reescreve a última amostra (ex.: barra do minuto corrente)."""
+        if self._n == 0:
+            return self.append(ts, valores)
+        self._gravar((self._pos - 1) % self.capacidade, ts, valores)
+
+    def _fatia(self, n: int | None) -> slice:
+        n   = self._n if n is None else min(n, self._n)
+        fim = self._pos + self.capacidade
+        return slice(fim - n, fim)
+
+    def janela(self, n: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Views (timestamps, valores) das últimas `n` amostras, da mais antiga à mais nova."""
+        f  = self._fatia(n)
+        ts = self._ts[f]
+        vs = self._val[f]
+        ts.flags.writeable = False
+        vs.flags.writeable = False
+        return ts, vs
+
+    def coluna(self, campo: str, n: int | None = None) -> np.ndarray:
+        v = self._val[self._fatia(n), self._idx[campo]]
+        v.flags.writeable = False
+        return v
+
+    def ultimo(self) -> dict | None:
+        if self._n == 0:
+            return None
+        i = self._pos - 1 + self.capacidade
+        return {"ts": pd.Timestamp(int(self._ts[i]), tz="UTC"),
+                **{c: float(self._val[i, j]) for c, j in self._idx.items()}}
+
+    def para_dataframe(self, n: int | None = None, tz=None) -> pd.DataFrame:
+        """Cópia em DataFrame (para gráficos/tabelas)."""
+        ts, vs = self.janela(n)
+        idx = pd.DatetimeIndex(ts.astype("datetime64[ns]"), tz="UTC")
+        if tz is not None:
+            idx = idx.tz_convert(tz)
+        return pd.DataFrame(vs.copy(), index=idx, columns=list(self.campos))
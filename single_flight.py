@@ -0,0 +1,129 @@
+import threading
+import time
+from functools import wraps
+
+# ─────────────────────────────────────────────
+# Single-flight — uma busca upstream por janela de TTL
+# ─────────────────────────────────────────────
+# Para o que não passa pelo st.cache_data (montagem do snapshot, ingestão
+# intraday, sincronização do histórico): só uma thread busca por janela de TTL,
+# as demais recebem o valor anterior (ou esperam o resultado, se ainda não há).
+#
+# Não vai debaixo do st.cache_data: ele já trava o cálculo por chave, então as
+# chamadas concorrentes são coalescidas antes de chegar aqui e o valor anterior
+# nunca seria servido.
+#
+# O estado vive neste módulo e não na função decorada porque o Streamlit
+# re-executa o script a cada rerun e redefine as funções; os grupos são
+# identificados pelo nome qualificado da função.
+
+
+class _Entrada:
+    __slots__ = ("valor", "instante", "tem_valor", "erro", "em_voo")
+
+    def __init__(self):
+        self.valor     = None
+        self.instante  = 0.0
+        self.tem_valor = False
+        self.erro      = None
+        self.em_voo    = None   # threading.Event da busca em andamento
+
+
+class SingleFlight:
+    """Coalesce chamadas concorrentes por chave dentro de uma janela de TTL."""
+
+    def __init__(self, ttl: float):
+        self.ttl       = ttl
+        self._lock     = threading.Lock()
+        self._entradas: dict = {}
+        # contadores para /metrics
+        self.acertos   = 0     # valor dentro do TTL
+        self.execucoes = 0     # chamadas que foram de fato à origem
+        self.obsoletos = 0     # valor vencido servido enquanto outra thread busca
+        self.esperas   = 0     # chamadas que esperaram a busca em andamento
+
+    def executar(self, chave, func, *args, **kwargs):
+        with self._lock:
+            e = self._entradas.get(chave)
+            if e is None:
+                e = self._entradas[chave] = _Entrada()
+            if e.tem_valor and time.monotonic() - e.instante < self.ttl:
+                self.acertos += 1
+                return e.valor
+            if e.em_voo is not None:
+                # Outra thread já está buscando: serve o valor anterior se houver
+                if e.tem_valor:
+                    self.obsoletos += 1
+                    return e.valor
+                self.esperas += 1
+                evento, lider = e.em_voo, False
+            else:
+                self.execucoes += 1
+                evento = e.em_voo = threading.Event()
+                lider  = True
+
+        if not lider:
+            evento.wait()
+            if e.erro is not None:
+                raise e.erro
+            return e.valor
+
+        try:
+            valor = func(*args, **kwargs)
+        except BaseException as exc:
+            with self._lock:
+                e.erro, e.em_voo = exc, None
+            evento.set()
+            raise
+        with self._lock:
+            e.valor, e.instante, e.tem_valor = valor, time.monotonic(), True
+            e.erro, e.em_voo = None, None
+        evento.set()
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+_grupos: dict[str, SingleFlight] = {}
+_grupos_lock = threading.Lock()
+
+
+def grupo(nome: str, ttl: float) -> SingleFlight:
+    """Retorna (criando se preciso) o grupo single-flight de nome dado."""
+    with _grupos_lock:
+        sf = _grupos.get(nome)
+        if sf is None:
+            sf = _grupos[nome] = SingleFlight(ttl)
+        sf.ttl = ttl
+        return sf
+
+
+def single_flight(ttl: float):
+    """Decorator: no máximo uma execução de `func` por argumentos a cada `ttl` segundos."""
+    def decorador(func):
+        nome = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            chave = (args, tuple(sorted(kwargs.items())))
+            return grupo(nome, ttl).executar(chave, func, *args, **kwargs)
+
+        return wrapper
+    return decorador
+
+
+def limpar_todos():
+    """Descarta todos os valores guardados (usado pelo botão 🔄 Atualizar)."""
+    with _grupos_lock:
+        for sf in _grupos.values():
+            sf.limpar()
+
+
+def estatisticas() -> dict[str, dict]:
+    """Contadores de cada grupo, por nome da função."""
+    with _grupos_lock:
+        return {nome: {"acertos": sf.acertos, "execucoes": sf.execucoes,
+                       "obsoletos": sf.obsoletos, "esperas": sf.esperas}
+                for nome, sf in _grupos.items()}
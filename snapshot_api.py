@@ -0,0 +1,168 @@
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from wdo_calc import frame_bandas_ptax
+from market_snapshot import MarketSnapshot, obter_snapshot, snapshot_atual
+from source_metrics import texto_prometheus
+
+# ─────────────────────────────────────────────
+# API local (JSON/HTTP) do snapshot corrente
+# ─────────────────────────────────────────────
+# Serve as bandas e paridades para robôs e planilhas sem renderizar o
+# dashboard. Lê o mesmo snapshot que a UI usa; o JSON é serializado uma vez
+# por snapshot, então cada requisição só copia bytes prontos.
+#
+#   GET /snapshot   → JSON completo
+#   GET /health     → {"ok": true, "idade_s": ...}
+#   GET /metrics    → contadores e histogramas no formato texto do Prometheus
+#
+# Em processo: defina WDO_API_PORT antes de `streamlit run appdist.py`.
+# Ao lado do app: `python snapshot_api.py [porta]`.
+
+HOST_PADRAO     = "127.0.0.1"
+PORTA_PADRAO    = 8765
+TIPO_JSON       = "application/json; charset=utf-8"
+TIPO_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _bandas_ptax_para_dict(bandas_ptax: dict | None, ptax: pd.DataFrame) -> dict | None:
+    if bandas_ptax is None:
+        return None
+    frame = frame_bandas_ptax(ptax, bandas_ptax).drop(columns=["data_hora"], errors="ignore")
+    return {"deslocamento_val": bandas_ptax["deslocamento_val"],
+            "deslocamento_pts": bandas_ptax["deslocamento_pts"],
+            "ptaxes":           frame.to_dict("records")}
+
+
+def _sem_nan(valor):
+    """NaN/inf viram None (null): JSON estrito não tem esses valores."""
+    if isinstance(valor, float):
+        return valor if math.isfinite(valor) else None
+    if isinstance(valor, dict):
+        return {k: _sem_nan(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_sem_nan(v) for v in valor]
+    return valor
+
+
+def snapshot_para_dict(snap: MarketSnapshot) -> dict:
+    """Campos publicados pela API, nomes estáveis para os consumidores."""
+    return _sem_nan({
+        "gerado_em":        snap.gerado_em.isoformat(),
+        "horario":          snap.horario,
+        "wdo_fut":          snap.wdo_fut,
+        "abertura":         snap.wdo_abertura,
+        "over":             snap.over,
+        "preco_justo":      snap.preco_justo,
+        "paridade_ouro":    snap.paridade_ouro,
+        "dxy_var":          snap.dxy_var,
+        "sup_volb3":        snap.sup_volb3,
+        "vencimento":       snap.venc_str,
+        "dias_uteis":       snap.du,
+        "bandas":           snap.bandas,
+        "bandas_ptax":      _bandas_ptax_para_dict(snap.bandas_ptax, snap.ptax),
+        "ptax_recente_brl": snap.ptax_recente_brl,
+        "paridades_ptax":   None if snap.paridades_ptax is None
+                            else snap.paridades_ptax.to_dict("records"),
+        "bandas_ptax_moedas": _bandas_ptax_para_dict(snap.bandas_ptax_moedas, snap.ptax_moedas),
+        "distorcoes": {
+            "ouro": snap.dist_ouro,
+            "ptax": snap.dist_ptax,
+        },
+    })
+
+
+_json_lock  = threading.Lock()
+_json_cache = (None, b"")   # (snapshot, bytes serializados)
+
+def snapshot_json(snap: MarketSnapshot) -> bytes:
+    global _json_cache
+    with _json_lock:
+        if _json_cache[0] is not snap:
+            corpo = json.dumps(snapshot_para_dict(snap), ensure_ascii=False,
+                               allow_nan=False, default=str)
+            _json_cache = (snap, corpo.encode("utf-8"))
+        return _json_cache[1]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # cabeçalho e corpo saem em writes separados
+
+    def do_GET(self):
+        rota = self.path.split("?", 1)[0].rstrip("/")
+        snap = snapshot_atual()
+        if rota in ("", "/snapshot"):
+            if snap is None:
+                return self._responder(503, b'{"erro": "snapshot ainda nao disponivel"}')
+            return self._responder(200, snapshot_json(snap))
+        if rota == "/health":
+            idade = round(time.time() - snap.gerado_em.timestamp(), 1) if snap else None
+            corpo = json.dumps({"ok": snap is not None, "idade_s": idade}).encode()
+            return self._responder(200, corpo)
+        if rota == "/metrics":
+            texto = texto_prometheus()
+            if snap is not None:
+                texto += ("# HELP wdo_snapshot_idade_segundos Idade do snapshot servido.\n"
+                          "# TYPE wdo_snapshot_idade_segundos gauge\n"
+                          f"wdo_snapshot_idade_segundos {time.time() - snap.gerado_em.timestamp():.1f}\n")
+            return self._responder(200, texto.encode("utf-8"), TIPO_PROMETHEUS)
+        self._responder(404, b'{"erro": "rota desconhecida"}')
+
+    def _responder(self, status: int, corpo: bytes, tipo: str = TIPO_JSON):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def _atualizar_periodicamente(intervalo: float):
+    # obter_snapshot() é cacheado: só reconstrói quando o TTL vence
+    while True:
+        try:
+            obter_snapshot()
+        except Exception:
+            pass
+        time.sleep(intervalo)
+
+
+def iniciar_api(porta: int = PORTA_PADRAO, host: str = HOST_PADRAO,
+                intervalo: float = 30.0) -> ThreadingHTTPServer:
+    """Sobe o servidor e o atualizador do snapshot em threads daemon."""
+    servidor = ThreadingHTTPServer((host, porta), _Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="wdo-api", daemon=True).start()
+    threading.Thread(target=_atualizar_periodicamente, args=(intervalo,),
+                     name="wdo-api-refresh", daemon=True).start()
+    return servidor
+
+
+def porta_configurada() -> int | None:
+    v = os.environ.get("WDO_API_PORT")
+    return int(v) if v else None
+
+
+if __name__ == "__main__":
+    import sys
+    from dde_watch import ObservadorDDE, arquivo_configurado
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else (porta_configurada() or PORTA_PADRAO)
+    if arquivo_configurado():
+        ObservadorDDE(arquivo_configurado()).iniciar()
+    srv = iniciar_api(porta)
+    print(f"API WDO em http://{HOST_PADRAO}:{porta}/snapshot")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
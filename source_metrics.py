@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from single_flight import estatisticas as estatisticas_single_flight
+from circuit_breaker import (
+    ABERTO, MEIO_ABERTO, DisjuntorAberto, RespostaVazia, disjuntores, resultado_vazio,
+)
+
+# ─────────────────────────────────────────────
+# Latência e frescor por fonte
+# ─────────────────────────────────────────────
+# Cada buscar_* é envolvido assim:
+#
+#   @instrumentar("Ouro BRL")        ← mede toda chamada (cache, disjuntor ou upstream)
+#   @st.cache_data(...)
+#   @com_disjuntor("Ouro BRL")       ← aberto: levanta DisjuntorAberto, sem ir ao upstream
+#   @na_origem                        ← só roda quando a busca vai mesmo ao upstream
+#   def buscar_ouro_brl(): ...
+#
+# Se o corpo não rodou, a chamada foi servida pelo cache (ou esperou a busca
+# de outra sessão), a menos que o disjuntor tenha respondido: essas chamadas são
+# contadas à parte (curtos) e não como acertos. As exceções do disjuntor
+# (DisjuntorAberto, RespostaVazia) terminam aqui: o valor que carregam é
+# devolvido, e o st.cache_data não guarda nenhum dos dois. p50/p95 são
+# calculados só sobre as idas ao upstream, que é o que deixa a página lenta.
+# Os fetchers engolem exceções e devolvem None, então resultado vazio conta
+# como erro.
+
+JANELA = 100      # últimas idas ao upstream usadas no p50/p95
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_local = threading.local()
+_lock  = threading.Lock()
+
+
+class Histograma:
+    """Histograma cumulativo no formato do Prometheus (buckets em segundos)."""
+    __slots__ = ("contagens", "soma", "n")
+
+    def __init__(self):
+        self.contagens = [0] * len(BUCKETS)
+        self.soma      = 0.0
+        self.n         = 0
+
+    def observar(self, v: float):
+        self.soma += v
+        self.n    += 1
+        for i, limite in enumerate(BUCKETS):
+            if v <= limite:
+                self.contagens[i] += 1
+
+
+class MetricaFonte:
+    __slots__ = ("nome", "chamadas", "acertos", "curtos", "erros", "ultima_latencia",
+                 "ultima_origem", "ultimo_ok", "ultima_busca", "latencias", "histograma")
+
+    def __init__(self, nome: str):
+        self.nome            = nome
+        self.chamadas        = 0
+        self.acertos         = 0
+        self.curtos          = 0       # respondidas pelo disjuntor aberto
+        self.erros           = 0
+        self.ultima_latencia = None    # segundos, última chamada
+        self.ultima_origem   = None    # "cache", "upstream" ou "disjuntor"
+        self.ultimo_ok       = None
+        self.ultima_busca    = None    # time.time() da última ida ao upstream com dado
+        self.latencias       = deque(maxlen=JANELA)
+        self.histograma      = Histograma()
+
+    def percentil(self, q: float) -> float | None:
+        return float(np.percentile(self.latencias, q)) if self.latencias else None
+
+    @property
+    def idade(self) -> float | None:
+        """Segundos desde que o dado servido foi buscado na origem."""
+        return None if self.ultima_busca is None else time.time() - self.ultima_busca
+
+
+_metricas: dict[str, MetricaFonte] = {}
+
+
+def registrar(nome: str, latencia: float, acerto: bool, ok: bool, curto: bool = False):
+    """`curto`: o disjuntor respondeu sem ir ao upstream (não mexe em ok/erros)."""
+    with _lock:
+        m = _metricas.get(nome)
+        if m is None:
+            m = _metricas[nome] = MetricaFonte(nome)
+        m.chamadas       += 1
+        m.ultima_latencia = latencia
+        if curto:
+            m.curtos       += 1
+            m.ultima_origem = "disjuntor"
+            return
+        m.ultima_origem = "cache" if acerto else "upstream"
+        m.ultimo_ok     = ok
+        if acerto:
+            m.acertos += 1
+        else:
+            m.latencias.append(latencia)
+            m.histograma.observar(latencia)
+            if ok:
+                m.ultima_busca = time.time()
+        if not ok:
+            m.erros += 1
+
+
+def na_origem(func):
+    """Marca que a chamada chegou ao corpo do fetcher (cache miss)."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        _local.na_origem = True
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def instrumentar(nome: str):
+    """Decorator: mede latência e desfecho. `nome` aceita {0}, {1}… dos argumentos."""
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            anterior = getattr(_local, "na_origem", False)
+            _local.na_origem, _local.curto = False, False
+            t0 = time.perf_counter()
+            try:
+                valor = func(*args, **kwargs)
+            except DisjuntorAberto as e:
+                valor, _local.curto = e.valor, True
+            except RespostaVazia as e:
+                valor = e.valor
+            except BaseException:
+                registrar(nome.format(*args), time.perf_counter() - t0,
+                          not _local.na_origem, False)
+                _local.na_origem = anterior
+                raise
+            foi_origem, _local.na_origem = _local.na_origem, anterior
+            registrar(nome.format(*args), time.perf_counter() - t0,
+                      not foi_origem, not resultado_vazio(valor), curto=_local.curto)
+            return valor
+
+        return wrapper
+    return decorador
+
+
+def metricas() -> list[MetricaFonte]:
+    with _lock:
+        return list(_metricas.values())
+
+
+def metrica(nome: str) -> MetricaFonte | None:
+    with _lock:
+        return _metricas.get(nome)
+
+
+def tabela_metricas() -> pd.DataFrame:
+    """DataFrame para o painel de status (uma linha por fonte)."""
+    def ms(v):
+        return None if v is None else round(v * 1000, 1)
+
+    linhas = [{
+        "Fonte":       m.nome,
+        "Última (ms)": ms(m.ultima_latencia),
+        "Origem":      m.ultima_origem or "—",
+        "p50 (ms)":    ms(m.percentil(50)),
+        "p95 (ms)":    ms(m.percentil(95)),
+        "Idade (s)":   None if m.idade is None else round(m.idade),
+        "Chamadas":    m.chamadas,
+        "Acertos":     m.acertos,
+        "Curtos":      m.curtos,
+        "Erros":       m.erros,
+    } for m in metricas()]
+    return pd.DataFrame(linhas)
+
+
+_reruns = Histograma()
+
+def registrar_rerun(segundos: float):
+    with _lock:
+        _reruns.observar(segundos)
+
+
+def limpar():
+    with _lock:
+        _metricas.clear()
+
+# ─────────────────────────────────────────────
+# Exposição no formato texto do Prometheus (GET /metrics)
+# ─────────────────────────────────────────────
+def _rotulo(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _linhas_histograma(nome: str, rotulos: str, h: Histograma) -> list[str]:
+    sep = "," if rotulos else ""
+    linhas = [f'{nome}_bucket{{{rotulos}{sep}le="{le}"}} {c}' for le, c in zip(BUCKETS, h.contagens)]
+    linhas.append(f'{nome}_bucket{{{rotulos}{sep}le="+Inf"}} {h.n}')
+    chaves = f"{{{rotulos}}}" if rotulos else ""
+    linhas.append(f"{nome}_sum{chaves} {h.soma:.6f}")
+    linhas.append(f"{nome}_count{chaves} {h.n}")
+    return linhas
+
+
+def texto_prometheus() -> str:
+    with _lock:
+        fontes = [(m.nome, m.chamadas, m.acertos, m.erros, m.idade, m.histograma, m.curtos)
+                  for m in _metricas.values()]
+        reruns = Histograma()
+        reruns.contagens, reruns.soma, reruns.n = list(_reruns.contagens), _reruns.soma, _reruns.n
+
+    out = []
+
+    def familia(nome, tipo, ajuda, linhas):
+        out.append(f"# HELP {nome} {ajuda}")
+        out.append(f"# TYPE {nome} {tipo}")
+        out.extend(linhas)
+
+    def por_fonte(valor):
+        return [f'{{fonte="{_rotulo(f[0])}"}} {valor(f)}' for f in fontes]
+
+    familia("wdo_fonte_chamadas_total", "counter", "Chamadas aos buscar_* (cache ou upstream).",
+            ["wdo_fonte_chamadas_total" + l for l in por_fonte(lambda f: f[1])])
+    familia("wdo_fonte_cache_acertos_total", "counter", "Chamadas servidas sem ir ao upstream.",
+            ["wdo_fonte_cache_acertos_total" + l for l in por_fonte(lambda f: f[2])])
+    familia("wdo_fonte_cache_faltas_total", "counter", "Chamadas que foram ao upstream.",
+            ["wdo_fonte_cache_faltas_total" + l for l in por_fonte(lambda f: f[1] - f[2] - f[6])])
+    familia("wdo_fonte_curtos_total", "counter", "Chamadas respondidas pelo disjuntor aberto.",
+            ["wdo_fonte_curtos_total" + l for l in por_fonte(lambda f: f[6])])
+    familia("wdo_fonte_erros_total", "counter", "Chamadas sem dado (exceção ou resultado vazio).",
+            ["wdo_fonte_erros_total" + l for l in por_fonte(lambda f: f[3])])
+    familia("wdo_fonte_idade_segundos", "gauge", "Idade do último dado obtido no upstream.",
+            [f'wdo_fonte_idade_segundos{{fonte="{_rotulo(f[0])}"}} {f[4]:.1f}'
+             for f in fontes if f[4] is not None])
+    hist = []
+    for f in fontes:
+        hist += _linhas_histograma("wdo_fonte_latencia_segundos", f'fonte="{_rotulo(f[0])}"', f[5])
+    familia("wdo_fonte_latencia_segundos", "histogram", "Latência das idas ao upstream.", hist)
+
+    sf = estatisticas_single_flight()
+    for campo, ajuda in [("acertos",   "Chamadas dentro do TTL."),
+                         ("execucoes", "Chamadas que executaram a função."),
+                         ("obsoletos", "Valor vencido servido enquanto outra thread atualiza."),
+                         ("esperas",   "Chamadas que esperaram a busca em andamento.")]:
+        nome = f"wdo_single_flight_{campo}_total"
+        familia(nome, "counter", ajuda,
+                [f'{nome}{{funcao="{_rotulo(g)}"}} {c[campo]}' for g, c in sorted(sf.items())])
+
+    codigo = {ABERTO: 2, MEIO_ABERTO: 1}
+    estados = [(d.nome, codigo.get(d.estado, 0), d.curtos) for d in disjuntores()]
+    familia("wdo_disjuntor_estado", "gauge", "Estado do disjuntor: 0 fechado, 1 meio-aberto, 2 aberto.",
+            [f'wdo_disjuntor_estado{{fonte="{_rotulo(n)}"}} {e}' for n, e, _ in estados])
+    familia("wdo_disjuntor_curtos_total", "counter", "Chamadas respondidas com o disjuntor aberto.",
+            [f'wdo_disjuntor_curtos_total{{fonte="{_rotulo(n)}"}} {c}' for n, _, c in estados])
+
+    familia("wdo_rerun_duracao_segundos", "histogram", "Duração de um rerun completo do appdist.py.",
+            _linhas_histograma("wdo_rerun_duracao_segundos", "", reruns))
+    return "\n".join(out) + "\n"
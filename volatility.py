@@ -0,0 +1,123 @@
+import math
+import threading
+
+from intraday import buffer_intraday
+
+# ─────────────────────────────────────────────
+# Volatilidade dinâmica — alternativa ao SUP_VOLB3
+# ─────────────────────────────────────────────
+# SUP_VOLB3 é a vol implícita (% a.a.) lida da base_b3 da planilha e só muda
+# quando o arquivo é reenviado. Aqui a vol é estimada online a partir dos
+# log-retornos do USD/BRL: EWMA (RiskMetrics) e variância de Welford, ambas
+# atualizadas em O(1) por cotação e anualizadas na mesma unidade (% a.a.).
+#
+# Barras intraday são anualizadas pelo espaçamento observado entre elas: o
+# BRLUSD=X do Yahoo cota 24 h (≈1440 barras de 1 min por dia, não um pregão de
+# 9 h), e minutos sem negócio alargam o espaçamento médio.
+
+LAMBDA_PADRAO    = 0.94
+PERIODOS_DIARIO  = 252
+DIA_FX_SEG       = 24 * 3600      # dia de negociação do câmbio no Yahoo
+LACUNA_MAX_SEG   = 3600           # espaço maior que isso é fechamento, não barra
+
+FONTES_VOL = {
+    "planilha": "SUP_VOLB3 (planilha)",
+    "diaria":   "EWMA diária (USD/BRL)",
+    "intraday": "EWMA intraday 1 min (USD/BRL)",
+}
+
+
+class EstimadorVol:
+    """Vol EWMA e de Welford sobre log-retornos, com atualização O(1).
+
+    `periodos_por_ano=None`: anualiza pelo espaçamento médio entre as barras
+    (timestamps em ns), sem contar as lacunas de fechamento.
+    """
+
+    def __init__(self, lam: float = LAMBDA_PADRAO, periodos_por_ano: float | None = PERIODOS_DIARIO):
+        self.lam       = lam
+        self.ppa       = periodos_por_ano
+        self.n         = 0
+        self.var_ewma  = None
+        self.ultimo_ts = None
+        self._ult      = None
+        self._media    = 0.0
+        self._m2       = 0.0
+        self._espaco   = 0.0        # segundos entre barras (média)
+        self._n_espaco = 0
+
+    def atualizar(self, preco: float | None, ts=None):
+        if preco is None or not preco > 0:
+            return
+        if ts is not None and self.ultimo_ts is not None and ts <= self.ultimo_ts:
+            return
+        if self._ult is not None:
+            r = math.log(preco / self._ult)
+            self.n += 1
+            delta = r - self._media
+            self._media += delta / self.n
+            self._m2    += delta * (r - self._media)
+            r2 = r * r
+            self.var_ewma = r2 if self.var_ewma is None else self.lam * self.var_ewma + (1 - self.lam) * r2
+            if ts is not None and self.ultimo_ts is not None:
+                dt = (ts - self.ultimo_ts) / 1e9
+                if dt <= LACUNA_MAX_SEG:
+                    self._n_espaco += 1
+                    self._espaco   += (dt - self._espaco) / self._n_espaco
+        self._ult, self.ultimo_ts = preco, ts
+
+    @property
+    def periodos_por_ano(self) -> float | None:
+        if self.ppa is not None:
+            return self.ppa
+        if not self._n_espaco:
+            return None
+        return PERIODOS_DIARIO * DIA_FX_SEG / self._espaco
+
+    def _anualizar(self, var):
+        ppa = self.periodos_por_ano
+        if var is None or ppa is None:
+            return None
+        return round(math.sqrt(var * ppa) * 100, 4)
+
+    @property
+    def vol_ewma(self) -> float | None:
+        """Vol EWMA anualizada, em % a.a."""
+        return self._anualizar(self.var_ewma)
+
+    @property
+    def vol_welford(self) -> float | None:
+        """Desvio-padrão amostral dos retornos, anualizado, em % a.a."""
+        return self._anualizar(self._m2 / (self.n - 1)) if self.n >= 2 else None
+
+
+def vol_de_serie(precos, lam: float = LAMBDA_PADRAO,
+                 periodos_por_ano: int = PERIODOS_DIARIO) -> EstimadorVol:
+    est = EstimadorVol(lam, periodos_por_ano)
+    for p in precos:
+        est.atualizar(p)
+    return est
+
+# ─────────────────────────────────────────────
+# Estimador intraday alimentado pelo ring buffer
+# ─────────────────────────────────────────────
+_intraday: dict[str, EstimadorVol] = {}
+_lock = threading.Lock()
+
+def vol_intraday(ticker: str, lam: float = LAMBDA_PADRAO) -> EstimadorVol:
+    """Estimador do processo para `ticker`; consome só as barras fechadas ainda
+    não vistas. A última barra do buffer ainda está se formando (atualizar_intraday
+    a substitui a cada busca) e só entra quando chega a seguinte."""
+    with _lock:
+        est = _intraday.get(ticker)
+        if est is None:
+            est = _intraday[ticker] = EstimadorVol(lam, None)
+    buf = buffer_intraday(ticker)
+    with buf.lock, _lock:
+        ts, _ = buf.janela()
+        close = buf.coluna("close")
+        inicio = 0 if est.ultimo_ts is None else int(ts.searchsorted(est.ultimo_ts, side="right"))
+        fim    = len(ts) - 1
+        for t, p in zip(ts[inicio:fim], close[inicio:fim]):
+            est.atualizar(float(p), int(t))
+    return est
@@ -0,0 +1,259 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────────────────────────
+# Cálculos do WDO — funções puras, sem Streamlit
+# ─────────────────────────────────────────────
+TZ = ZoneInfo("America/Sao_Paulo")
+
+# ─────────────────────────────────────────────
+# Utilitários
+# ─────────────────────────────────────────────
+def agora_br():
+    return datetime.now(tz=TZ).strftime("%d/%m/%Y %H:%M:%S")
+
+def calcular_vencimento_wdo(data_base: datetime) -> datetime:
+    mes = data_base.month + 1 if data_base.month < 12 else 1
+    ano = data_base.year  if data_base.month < 12 else data_base.year + 1
+    d   = datetime(ano, mes, 1)
+    while d.weekday() >= 5:
+        d += timedelta(days=1)
+    return d
+
+MESES_CONTRATO = "FGHJKMNQUVXZ"       # código de mês da B3 (jan → F … dez → Z)
+
+def vencimentos_wdo(data_base: datetime, n: int = 3) -> list[datetime]:
+    """Os n próximos vencimentos do WDO; o primeiro é o de calcular_vencimento_wdo."""
+    vencs = [calcular_vencimento_wdo(data_base)]
+    while len(vencs) < n:
+        vencs.append(calcular_vencimento_wdo(vencs[-1]))
+    return vencs
+
+def contrato_wdo(vencimento: datetime) -> str:
+    return f"WDO{MESES_CONTRATO[vencimento.month - 1]}{vencimento:%y}"
+
+def dias_uteis(data_base: datetime, vencimentos: list[datetime]) -> np.ndarray:
+    """Dias úteis até cada vencimento, contando as duas pontas (mesma conta do
+    pd.bdate_range em ler_planilha), num único np.busday_count."""
+    fim = np.array([v.date() for v in vencimentos], dtype="datetime64[D]") + 1
+    return np.busday_count(np.datetime64(data_base.date(), "D"), fim)
+
+# ─────────────────────────────────────────────
+# Funções de cálculo
+# ─────────────────────────────────────────────
+def calc_abertura_wdo(wdo_fechamento, dxy_var):
+    if None in (wdo_fechamento, dxy_var):
+        return None
+    return round(wdo_fechamento * (1 + dxy_var / 100), 4)
+
+def calc_over(di1_fut, dias_uteis):
+    if None in (di1_fut, dias_uteis):
+        return None
+    return round(((1 + di1_fut) ** (1 / 252) - 1) * dias_uteis, 6)
+
+def calc_preco_justo(dolar_spot, over):
+    if None in (dolar_spot, over):
+        return None
+    return round(dolar_spot * (1 + over / 100), 4)
+
+def calc_paridade_ouro(xauusd, ouro_brl_g):
+    if None in (xauusd, ouro_brl_g):
+        return None
+    return round((ouro_brl_g / (xauusd / 31.1035)) * 1000, 4)
+
+def calc_bandas(wdo_abertura, over, sup_volb3, vol_dinamica=None):
+    """`vol_dinamica` (% a.a., ver volatility.py), quando dada, substitui o SUP_VOLB3."""
+    if vol_dinamica is not None:
+        sup_volb3 = vol_dinamica
+    if None in (wdo_abertura, over, sup_volb3):
+        return None
+    d = (wdo_abertura * over / 100) + sup_volb3
+    return {
+        "deslocamento":  round(d, 5),
+        "1ª Máxima":     round(wdo_abertura + d, 2),
+        "1ª Mínima":     round(wdo_abertura - d, 2),
+        "2ª Máxima":     round((wdo_abertura + d) * 1.005, 2),
+        "2ª Mínima":     round((wdo_abertura - d) * 0.995, 2),
+    }
+
+TIPOS_BANDA = ["1ª Máxima", "1ª Mínima", "2ª Máxima", "2ª Mínima"]
+
+def calc_bandas_ptax(wdo_abertura, over, sup_volb3, ptaxes, escala=None):
+    """Bandas sobre cada PTAX, numa passada vetorizada.
+
+    `ptaxes` é um DataFrame com a coluna "valor" (R$/US$), ex. frame_ptax(), ou
+    a lista de dicts antiga. Em "bandas" vem um array (n, 4), uma linha por
+    PTAX e colunas na ordem de TIPOS_BANDA; frame_bandas_ptax junta as duas
+    coisas quando é preciso uma tabela. `escala` (uma por linha) multiplica o
+    deslocamento; ver calc_bandas_ptax_moedas.
+    """
+    b = calc_bandas(wdo_abertura, over, sup_volb3)
+    if b is None:
+        return None
+    if isinstance(ptaxes, pd.DataFrame):
+        valores = ptaxes["valor"].to_numpy(dtype=float)
+    else:
+        valores = np.array([p["valor"] for p in ptaxes if p], dtype=float)
+    d    = b["deslocamento"]
+    base = valores * 1000
+    dl   = d if escala is None else d * np.asarray(escala, dtype=float)
+    alta, baixa = base + dl, base - dl
+    bandas = np.round(np.column_stack([alta, baixa, alta * 1.005, baixa * 0.995]), 2)
+    return {"deslocamento_val": d, "deslocamento_pts": round(d * 1000, 4), "bandas": bandas}
+
+def frame_bandas_ptax(ptaxes, bandas_ptax):
+    """O frame das PTAX com as quatro bandas como colunas (tabelas e API)."""
+    return ptaxes.reset_index(drop=True).assign(**dict(zip(TIPOS_BANDA, bandas_ptax["bandas"].T)))
+
+def calc_paridades_ptax(ptaxes):
+    """Última PTAX de cada moeda e a paridade cruzada contra o dólar.
+
+    `ptaxes` é o frame da busca em lote (frame_ptax com a coluna moeda).
+    "Moeda/USD" é quantos dólares vale uma unidade da moeda (EUR/USD ≈ 1,08),
+    "USD/Moeda" o inverso; sem USD no lote ficam NaN.
+    """
+    if ptaxes is None or ptaxes.empty or "moeda" not in ptaxes.columns:
+        return None
+    ult = ptaxes.sort_values(["moeda", "data_hora"]).drop_duplicates("moeda", keep="last")
+    valor = ult["valor"].to_numpy(dtype=float)
+    usd   = valor[(ult["moeda"] == "USD").to_numpy()]
+    cruz  = valor / usd[0] if len(usd) else np.full(len(valor), np.nan)
+    return pd.DataFrame({
+        "Moeda":     ult["moeda"].to_numpy(),
+        "Data":      ult["data"].to_numpy(),
+        "Hora":      ult["hora"].to_numpy(),
+        "PTAX (R$)": valor,
+        "Moeda/USD": np.round(cruz, 6),
+        "USD/Moeda": np.round(1 / cruz, 6),
+    })
+
+def matriz_cruzada(paridades):
+    """Paridade entre todos os pares de moedas: linha i, coluna j = unidades
+    de j por uma de i (razão das PTAX em R$), num único produto externo."""
+    if paridades is None or paridades.empty:
+        return None
+    v = paridades["PTAX (R$)"].to_numpy(dtype=float)
+    return pd.DataFrame(np.round(np.divide.outer(v, v), 6),
+                        index=paridades["Moeda"], columns=paridades["Moeda"])
+
+def calc_bandas_ptax_moedas(wdo_abertura, over, sup_volb3, ptaxes, paridades):
+    """Bandas de todas as janelas de todas as moedas numa passada só.
+
+    O deslocamento do WDO está em pontos por dólar; para a moeda que vale k
+    dólares o mesmo movimento, em pontos dela, é k vezes maior. Assim as linhas
+    em USD saem iguais às de calc_bandas_ptax.
+    """
+    if paridades is None or ptaxes is None or ptaxes.empty:
+        return None
+    escala = ptaxes["moeda"].map(paridades.set_index("Moeda")["Moeda/USD"])
+    return calc_bandas_ptax(wdo_abertura, over, sup_volb3, ptaxes,
+                            escala=escala.to_numpy(dtype=float))
+
+def _ou_nan(v):
+    return np.nan if v is None else v
+
+def calc_escada_wdo(vencimentos, dias_uteis, wdo_abertura, dolar_spot, di1_fut, sup_volb3):
+    """Over, preço justo e bandas de vários vencimentos numa passada vetorizada.
+
+    A referência do primeiro vencimento é a abertura estimada; a dos seguintes é
+    essa abertura carregada pelo diferencial de over (rolagem teórica), já que a
+    planilha só traz o WDOFUT. Entrada ausente vira NaN nas colunas que dependem
+    dela; sem DI1 não há escada.
+    """
+    if di1_fut is None or not len(vencimentos):
+        return None
+    du    = np.asarray(dias_uteis, dtype=float)
+    over  = np.round(((1 + di1_fut) ** (1 / 252) - 1) * du, 6)     # como calc_over
+    fator = 1 + over / 100
+    ref   = _ou_nan(wdo_abertura) * fator / fator[0]
+    d     = ref * over / 100 + _ou_nan(sup_volb3)
+    return pd.DataFrame({
+        "Contrato":     [contrato_wdo(v) for v in vencimentos],
+        "Vencimento":   [v.strftime("%d/%m/%Y") for v in vencimentos],
+        "DU":           du.astype(int),
+        "Over (%)":     over,
+        "Preço Justo":  np.round(_ou_nan(dolar_spot) * fator, 4),
+        "Referência":   np.round(ref, 4),
+        "Deslocamento": np.round(d, 5),
+        "1ª Máxima":    np.round(ref + d, 2),
+        "1ª Mínima":    np.round(ref - d, 2),
+        "2ª Máxima":    np.round((ref + d) * 1.005, 2),
+        "2ª Mínima":    np.round((ref - d) * 0.995, 2),
+    })
+
+def calc_base_wdo(escada, dolar_spot, wdo_fut, frp0):
+    """Base spot/futuro e pontos a termo sobre a escada de vencimentos.
+
+    Tudo em pontos de WDO. O futuro do primeiro vencimento é o WDOFUT; os
+    seguintes e o forward pelo FRP0 (spot + FRP0 no primeiro vencimento) são
+    levados aos demais pelo diferencial de over, como na escada. O carry
+    implícito sai da razão futuro/spot e é comparado ao over do DI1, que é o que
+    calc_preco_justo usa.
+    """
+    if escada is None or escada.empty:
+        return None
+    du    = escada["DU"].to_numpy(dtype=float)
+    over  = escada["Over (%)"].to_numpy(dtype=float)
+    fator = (1 + over / 100) / (1 + over[0] / 100)
+    spot  = np.nan if not dolar_spot else em_pontos(dolar_spot)
+    fut   = _ou_nan(wdo_fut) * fator
+    fwd   = (spot + _ou_nan(frp0)) * fator
+    justo = escada["Preço Justo"].to_numpy(dtype=float)
+    justo = em_pontos(justo)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        carry = (fut / spot - 1) * 100
+        taxa  = ((fut / spot) ** (252 / du) - 1) * 100
+    return pd.DataFrame({
+        "Contrato":               escada["Contrato"],
+        "DU":                     escada["DU"],
+        "Spot (pts)":             spot,
+        "Futuro (pts)":           np.round(fut, 2),
+        "Base (pts)":             np.round(fut - spot, 2),
+        "Base justa (pts)":       np.round(justo - spot, 2),
+        "Carry implícito (%)":    np.round(carry, 6),
+        "Over DI1 (%)":           over,
+        "Carry − Over (p.p.)":    np.round(carry - over, 6),
+        "Taxa implícita (% a.a.)": np.round(taxa, 4),
+        "Forward FRP0 (pts)":     np.round(fwd, 2),
+        "Futuro − Forward (pts)": np.round(fut - fwd, 2),
+    })
+
+def calc_distorcao(preco_ref, paridade, label):
+    """Retorna dict com desvio em pts e % entre preço de referência e uma paridade."""
+    if preco_ref is None or not paridade:
+        return None
+    desvio_pts = round(preco_ref - paridade, 2)
+    desvio_pct = round((preco_ref - paridade) / paridade * 100, 4)
+    return {"label": label, "ref": preco_ref, "paridade": paridade,
+            "desvio_pts": desvio_pts, "desvio_pct": desvio_pct}
+
+def em_distorcao(d, lim_pts, lim_pct) -> bool:
+    """True se o desvio supera qualquer um dos dois limiares."""
+    return abs(d["desvio_pts"]) > lim_pts or abs(d["desvio_pct"]) > lim_pct
+
+# ─────────────────────────────────────────────
+# Conversões de paridade (CME 6L / BRLUSD)
+# ─────────────────────────────────────────────
+def cme_to_brl(v):
+    return round(1 / v * 1000, 2) if v and v != 0 else None
+
+def inv(v):
+    return round(1 / v, 4) if v and v != 0 else None
+
+def em_pontos(v):
+    """Cotação em R$ por US$ (≈5,xx) para pontos de WDO; valores já em pontos passam direto.
+    Aceita também um array numpy (elemento a elemento)."""
+    if v is None:
+        return None
+    if isinstance(v, np.ndarray):
+        return np.where(np.abs(v) < 100, np.round(v * 1000, 2), v)
+    return round(v * 1000, 2) if abs(v) < 100 else v
+
+# ─────────────────────────────────────────────
+# Formatação
+# ─────────────────────────────────────────────
+def fmt(v, dec=2):
+    return f"{v:.{dec}f}" if v is not None else "—"
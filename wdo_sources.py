@@ -0,0 +1,363 @@
+import streamlit as st
+import pandas as pd
+import yfinance as yf
+import requests
+from bs4 import BeautifulSoup
+from datetime import datetime
+import os
+import time
+
+from source_metrics import instrumentar, na_origem
+from circuit_breaker import com_disjuntor, disjuntor
+from hedged import primeira_resposta
+from ptax_store import sincronizar_moedas, ptax_ultimo_dia_moedas
+from wdo_calc import calcular_vencimento_wdo
+
+# ─────────────────────────────────────────────
+# Constantes
+# ─────────────────────────────────────────────
+TICKERS = {
+    "cme":     "6L=F",
+    "brl_usd": "BRLUSD=X",
+    "xauusd":  "GC=F",
+    "dxy":     "DX-Y.NYB",
+}
+URL_OURO_BRL   = "https://www.melhorcambio.com/ouro-hoje"
+URL_PLANILHA   = "https://raw.githubusercontent.com/Mvrsant/calculoswdo/main/ddeprofit.xlsx"
+PLANILHA_LOCAL = "ddeprofit.xlsx"
+HEADERS        = {"User-Agent": "Mozilla/5.0"}
+ONCA_TROY_G    = 31.1035
+MOEDAS_PTAX    = "USD,EUR"           # padrão de WDO_PTAX_MOEDAS
+FAIXA_OURO_BRL = (50.0, 5000.0)     # R$/g plausível; fora disso a fonte é descartada
+IDADE_MAX_OURO = 24 * 3600          # arquivo local de ouro mais velho que isso é ignorado
+
+# ─────────────────────────────────────────────
+# Funções de busca de dados (cache do Streamlit, instrumentadas em
+# source_metrics). O st.cache_data já trava por chave: sessões que erram o
+# cache juntas esperam uma única busca, sem precisar de single-flight aqui.
+# ─────────────────────────────────────────────
+@instrumentar("yfinance {0}")
+@st.cache_data(ttl=300, show_spinner=False)
+@com_disjuntor("yfinance {0}")
+@na_origem
+def buscar_yfinance(ticker: str, period: str = "5d") -> dict | None:
+    try:
+        return resumo_diario(yf.Ticker(ticker).history(period=period))
+    except Exception as e:
+        st.warning(f"yfinance [{ticker}]: {e}")
+        return None
+
+@instrumentar("DXY")
+@st.cache_data(ttl=300, show_spinner=False)
+@com_disjuntor("DXY")
+@na_origem
+def buscar_variacao_dxy() -> float | None:
+    try:
+        return variacao_fechamento(yf.Ticker(TICKERS["dxy"]).history(period="5d"))
+    except Exception as e:
+        st.warning(f"DXY variação: {e}")
+        return None
+
+@instrumentar("Ouro BRL")
+@st.cache_data(ttl=600, show_spinner=False)
+@com_disjuntor("Ouro BRL")
+@na_origem
+def buscar_ouro_brl() -> float | None:
+    """Ouro em R$/g pela primeira fonte válida (ver hedged.py e fontes_ouro)."""
+    try:
+        res = primeira_resposta(fontes_ouro(), valida=ouro_valido,
+                                atraso=float(os.environ.get("WDO_OURO_ATRASO", 0.5)),
+                                rotulo="Ouro BRL")
+        if res is None:
+            st.warning("Ouro BRL: nenhuma fonte respondeu a tempo.")
+            return None
+        return res[1]
+    except Exception as e:
+        st.warning(f"Ouro BRL: {e}")
+        return None
+
+@instrumentar("Planilha B3")
+@st.cache_data(ttl=600, show_spinner=False)
+@com_disjuntor("Planilha B3")
+@na_origem
+def buscar_planilha_github() -> dict | None:
+    try:
+        r = requests.get(URL_PLANILHA, timeout=15)
+        if r.status_code != 200:
+            st.warning(f"Planilha GitHub: status {r.status_code}")
+            return None
+        with open(PLANILHA_LOCAL, "wb") as f:
+            f.write(r.content)
+
+        dados = ler_planilha(PLANILHA_LOCAL)
+        if dados is None:
+            st.warning("Colunas ausentes na planilha.")
+        return dados
+    except Exception as e:
+        st.warning(f"Planilha GitHub: {e}")
+        return None
+
+def buscar_sup_volb3() -> float | None:
+    """SUP_VOLB3 do ddeprofit.xlsx local, relido só quando o arquivo muda; sem
+    o arquivo, baixa a planilha do GitHub."""
+    mtime = os.path.getmtime(PLANILHA_LOCAL) if os.path.exists(PLANILHA_LOCAL) else None
+    return _buscar_sup_volb3(mtime)
+
+@instrumentar("SUP_VOLB3")
+@st.cache_data(ttl=600, max_entries=4, show_spinner=False)
+@com_disjuntor("SUP_VOLB3")
+@na_origem
+def _buscar_sup_volb3(mtime: float | None) -> float | None:
+    try:
+        if mtime is None:
+            r = requests.get(URL_PLANILHA, timeout=15)
+            with open(PLANILHA_LOCAL, "wb") as f:
+                f.write(r.content)
+        return ler_sup_volb3(PLANILHA_LOCAL)
+    except Exception as e:
+        st.warning(f"SUP_VOLB3: {e}")
+        return None
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _ler_planilha_versao(caminho: str, mtime: float, dia: str) -> dict | None:
+    return ler_planilha(caminho)
+
+def ler_planilha_local() -> dict | None:
+    """ddeprofit.xlsx local, relido só quando o arquivo muda (ou vira o dia,
+    por causa dos dias úteis). Levanta se o arquivo não existir ou não abrir."""
+    return _ler_planilha_versao(PLANILHA_LOCAL, os.path.getmtime(PLANILHA_LOCAL),
+                                datetime.today().strftime("%Y-%m-%d"))
+
+def moedas_ptax() -> tuple[str, ...]:
+    """Moedas da PTAX (WDO_PTAX_MOEDAS, separadas por vírgula); USD sempre entra."""
+    nomes = os.environ.get("WDO_PTAX_MOEDAS", MOEDAS_PTAX)
+    moedas = [m.strip().upper() for m in nomes.split(",") if m.strip()]
+    return tuple(dict.fromkeys(["USD", *moedas]))
+
+@instrumentar("PTAX moedas")
+@st.cache_data(ttl=300, show_spinner=False)
+@na_origem
+def buscar_ptax_moedas(moedas: tuple[str, ...]) -> pd.DataFrame:
+    """Janelas PTAX do dia mais recente de cada moeda, num frame só com a
+    coluna moeda; vazio se indisponível.
+
+    Há um disjuntor por moeda, só na sincronização com o BCB: moeda com ele
+    aberto (ou cujo download falhou) é servida do que já está na base local,
+    sem atrasar as demais.
+    """
+    ds = {m: disjuntor(f"BCB PTAX {m}") for m in moedas}
+    permitidas = [m for m, d in ds.items() if d.permitir()]
+    try:
+        if permitidas:
+            _, erros = sincronizar_moedas(permitidas)
+            for m in permitidas:
+                if m in erros:
+                    ds[m].falha()
+                    st.warning(f"PTAX {m} (BCB): {erros[m]}")
+                else:
+                    ds[m].sucesso()
+    except Exception as e:
+        for m in permitidas:        # falha local (base), não do BCB
+            ds[m].liberar()
+        st.warning(f"PTAX (BCB): {e}")
+    try:
+        return frame_ptax(ptax_ultimo_dia_moedas(list(moedas)))
+    except Exception as e:
+        st.warning(f"PTAX: {e}")
+        return frame_ptax(None)
+
+def buscar_ptax() -> pd.DataFrame:
+    """Janelas PTAX (USD) do dia mais recente, recortadas da busca em lote."""
+    frame = buscar_ptax_moedas(moedas_ptax())
+    usd   = frame[frame["moeda"] == "USD"] if "moeda" in frame.columns else frame
+    return usd.drop(columns="moeda", errors="ignore").reset_index(drop=True)
+
+# ─── Fontes de ouro em R$/g ─────────────────
+# Rodam em threads do hedged.py: não chamam st.* e sinalizam falha com None
+# ou exceção. WDO_OURO_FONTES escolhe e ordena as fontes (separadas por
+# vírgula); "arquivo" só entra com WDO_OURO_ARQUIVO definido.
+def _ouro_melhorcambio(cancelado) -> float | None:
+    r = requests.get(URL_OURO_BRL, headers=HEADERS, timeout=10)
+    r.raise_for_status()
+    return ler_ouro_brl(r.content)
+
+def _ouro_yahoo(cancelado) -> float | None:
+    """GC=F (US$/oz troy) convertido pelo BRLUSD=X."""
+    xau = resumo_diario(yf.Ticker(TICKERS["xauusd"]).history(period="5d"))
+    if xau is None or cancelado.is_set():
+        return None
+    brl = resumo_diario(yf.Ticker(TICKERS["brl_usd"]).history(period="5d"))
+    if brl is None or not brl["close"]:
+        return None
+    return round(xau["close"] / ONCA_TROY_G / brl["close"], 4)
+
+def _ouro_arquivo(cancelado) -> float | None:
+    caminho = os.environ.get("WDO_OURO_ARQUIVO")
+    if not caminho or time.time() - os.path.getmtime(caminho) > IDADE_MAX_OURO:
+        return None
+    with open(caminho, encoding="utf-8") as f:
+        return float(f.read().strip().replace(",", "."))
+
+FONTES_OURO = {
+    "melhorcambio": _ouro_melhorcambio,
+    "yahoo":        _ouro_yahoo,
+    "arquivo":      _ouro_arquivo,
+}
+
+def fontes_ouro() -> dict:
+    nomes = os.environ.get("WDO_OURO_FONTES")
+    if nomes:
+        nomes = [n.strip() for n in nomes.split(",") if n.strip() in FONTES_OURO]
+    else:
+        nomes = ["melhorcambio", "yahoo"] + (["arquivo"] if os.environ.get("WDO_OURO_ARQUIVO") else [])
+    return {n: FONTES_OURO[n] for n in nomes}
+
+def ouro_valido(v) -> bool:
+    return v is not None and FAIXA_OURO_BRL[0] <= v <= FAIXA_OURO_BRL[1]
+
+# ─── Leitura/parsing (sem rede) ─────────────
+def resumo_diario(hist: pd.DataFrame) -> dict | None:
+    """Última barra diária do yfinance (e o fechamento anterior)."""
+    if hist is None or hist.empty:
+        return None
+    return {
+        "open":  round(hist["Open"].iloc[-1],  4),
+        "high":  round(hist["High"].iloc[-1],  4),
+        "low":   round(hist["Low"].iloc[-1],   4),
+        "close": round(hist["Close"].iloc[-1], 4),
+        "prev":  round(hist["Close"].iloc[-2], 4) if len(hist) >= 2 else None,
+    }
+
+def variacao_fechamento(hist: pd.DataFrame) -> float | None:
+    if hist is None or len(hist) < 2:
+        return None
+    ant   = hist["Close"].iloc[-2]
+    atual = hist["Close"].iloc[-1]
+    return round(((atual - ant) / ant) * 100, 4)
+
+def ler_ouro_brl(html: bytes | str) -> float:
+    soup = BeautifulSoup(html, "html.parser")
+    val  = soup.find("input", {"id": "comercial"}).get("value")
+    return float(val.replace(",", "."))
+
+TIPOS_PTAX   = {"data_hora": "datetime64[ns]", "valor": "float64",
+                "data": object, "hora": object, "tipo_boletim": object}
+JANELAS_PTAX = 4            # consultas do dia (10h, 11h, 12h, 13h)
+
+def frame_ptax(df: pd.DataFrame | None) -> pd.DataFrame:
+    """Linhas do ptax_store (qualquer quantidade, um ou vários dias/moedas) em
+    colunas tipadas, com data e hora já formatadas de forma vetorizada."""
+    if df is None or df.empty:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in TIPOS_PTAX.items()})
+    dh = pd.to_datetime(df["data_hora"])
+    out = pd.DataFrame({
+        "data_hora":    dh,
+        "valor":        df["cotacao_venda"].astype(float),
+        "data":         dh.dt.strftime("%d/%m/%Y"),
+        "hora":         dh.dt.strftime("%H:%M"),
+        "tipo_boletim": df["tipo_boletim"],
+    })
+    if "moeda" in df.columns:
+        out["moeda"] = df["moeda"]
+    return out.reset_index(drop=True)
+
+def cotacoes_ptax(frame: pd.DataFrame, n: int = JANELAS_PTAX) -> list:
+    """Formato antigo (lista de n dicts, completada com None) para os apps legados."""
+    cotacoes = frame.head(n)[["valor", "data", "hora"]].to_dict("records")
+    return cotacoes + [None] * (n - len(cotacoes))
+
+class IndiceAtivos:
+    """Asset → linha da aba DDE, montado uma vez por planilha lida.
+
+    Guarda todas as linhas e colunas nomeadas da aba; cada consulta é um
+    acesso a dicionário + array, sem varrer a coluna Asset.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df[df["Asset"].notna()]
+        nomes = df["Asset"].astype(str).str.strip().tolist()
+        self.colunas = [c for c in df.columns if not str(c).startswith("Unnamed")]
+        self._linha  = {}
+        for i, nome in enumerate(nomes):
+            self._linha.setdefault(nome, i)       # repetido: vale a primeira linha
+        self._cols   = {c: df[c].to_numpy() for c in self.colunas}
+
+    def __contains__(self, ativo: str) -> bool:
+        return ativo in self._linha
+
+    def __len__(self) -> int:
+        return len(self._linha)
+
+    def ativos(self) -> list[str]:
+        return list(self._linha)
+
+    def _bruto(self, ativo: str, coluna: str):
+        i = self._linha.get(ativo)
+        if i is None or coluna not in self._cols:
+            return None
+        v = self._cols[coluna][i]
+        if pd.isna(v):
+            return None
+        return v.item() if hasattr(v, "item") else v
+
+    def numero(self, ativo: str, coluna: str) -> float | None:
+        v = self._bruto(ativo, coluna)
+        try:
+            return None if v is None else float(v)
+        except (TypeError, ValueError):
+            return None
+
+    def texto(self, ativo: str, coluna: str) -> str | None:
+        v = self._bruto(ativo, coluna)
+        return None if v is None else str(v).strip()
+
+    def data(self, ativo: str, coluna: str = "Vencimento") -> datetime | None:
+        v = self._bruto(ativo, coluna)
+        if v is None:
+            return None
+        t = pd.to_datetime(v, dayfirst=True, errors="coerce")
+        return None if pd.isna(t) else t.to_pydatetime()
+
+    def linha(self, ativo: str) -> dict | None:
+        if ativo not in self._linha:
+            return None
+        return {c: self._bruto(ativo, c) for c in self.colunas if c != "Asset"}
+
+    def para_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame([{"Asset": a, **self.linha(a)} for a in self._linha])
+
+
+def ler_ativos(caminho: str) -> IndiceAtivos | None:
+    """Índice de todos os ativos da aba DDE; None se faltarem colunas."""
+    df = pd.read_excel(caminho)
+    if not all(c in df.columns for c in ["Asset", "Fechamento Anterior", "Último"]):
+        return None
+    return IndiceAtivos(df)
+
+def ler_planilha(caminho: str) -> dict | None:
+    """Extrai os valores da aba DDE; None se faltarem colunas.
+
+    Além dos quatro campos usados nos cálculos, "ativos" traz o índice com
+    todas as linhas da aba.
+    """
+    idx = ler_ativos(caminho)
+    if idx is None:
+        return None
+
+    hoje     = datetime.today()
+    venc     = calcular_vencimento_wdo(hoje)
+    du       = len(pd.bdate_range(start=hoje, end=venc))
+
+    return {
+        "wdo_fut":                idx.numero("WDOFUT",  "Fechamento Anterior"),
+        "dolar_spot":             idx.numero("USD/BRL", "Fechamento Anterior"),
+        "di1_fut":                idx.numero("DI1FUT",  "Último"),
+        "frp0":                   idx.numero("FRP0",    "Último"),
+        "expiration_date":        venc.strftime("%d/%m/%Y"),
+        "business_days_remaining": du,
+        "ativos":                 idx,
+    }
+
+def ler_sup_volb3(caminho: str) -> float:
+    df = pd.read_excel(caminho, sheet_name="base_b3", header=None)
+    return float(df.iloc[18, 6])